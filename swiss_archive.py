@@ -0,0 +1,328 @@
+import argparse
+import csv
+import json
+import math
+import os
+
+import numpy as np
+
+from swiss_csv import (
+    MATCH_FIELDS, ROSTER_FIELDS, ROSTER_TITLE, STANDINGS_HEADER, STANDINGS_TITLE, format_standings_row, iter_csv_rounds,
+)
+from swiss_engine import (
+    BYE, BYE_RESULT, DOUBLE_LOSS, RESULT_BYE, RESULT_DOUBLE_LOSS, RESULT_P1_WIN, RESULT_P2_WIN,
+)
+
+# Columnar archive of many finished (or simulated) events, for analysis at a
+# scale where parsing CSV exports gets slow.
+#
+# An archive is a directory of flat little-endian column files plus
+# meta.json, which holds the row counts, the player name table and the event
+# labels. Readers map the columns with np.memmap, so opening an archive reads
+# only meta.json and a query touches just the pages of the columns it uses.
+#
+#   matches.*     one row per match or bye, events one after another
+#                 event, round, player1, player2 (-1 for a bye), result
+#                 (RESULT_P1_WIN / RESULT_P2_WIN / RESULT_DOUBLE_LOSS / RESULT_BYE)
+#   standings.*   one row per player per event in final order
+#                 event, rank, player, points, wins, losses, ties, omw, oomw
+#                 (oomw is NaN for CSV files from before that column)
+#   events.*      match_start, standings_start and rounds per event
+#   roster.*      event, player: every player per event in engine id order
+#                 (absent in archives from before it)
+#
+# Player ids index the archive's name table; a name keeps its id across all
+# events. Columns are appended and meta.json is replaced last, so a crash
+# while appending leaves the archive as it was (the extra bytes are ignored).
+#
+#   python swiss_archive.py pack season.swa events/*.csv
+#   python swiss_archive.py unpack season.swa out_dir/
+#   python swiss_archive.py info season.swa
+
+ARCHIVE_VERSION = 1
+META_FILE = "meta.json"
+MATCH_COLUMNS = [("event", "<i4"), ("round", "<i2"), ("player1", "<i4"), ("player2", "<i4"), ("result", "<i1")]
+STANDINGS_COLUMNS = [("event", "<i4"), ("rank", "<i4"), ("player", "<i4"), ("points", "<i4"), ("wins", "<i4"),
+                     ("losses", "<i4"), ("ties", "<i4"), ("omw", "<f8"), ("oomw", "<f8")]
+EVENT_COLUMNS = [("match_start", "<i8"), ("standings_start", "<i8"), ("rounds", "<i4")]
+ROSTER_COLUMNS = [("event", "<i4"), ("player", "<i4")]
+TABLES = {"matches": MATCH_COLUMNS, "standings": STANDINGS_COLUMNS, "events": EVENT_COLUMNS, "roster": ROSTER_COLUMNS}
+
+def _column_path(path, table, column):
+    return os.path.join(path, f"{table}.{column}")
+
+def _read_meta(path):
+    with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get("version") != ARCHIVE_VERSION:
+        raise ValueError(f"不支援的封存版本: {meta.get('version')}")
+    return meta
+
+class ArchiveWriter:
+    # Appends events to a new or (append=True) existing archive; close()
+    # commits them
+    def __init__(self, path, append=False):
+        self.path = path
+        meta = None
+        if append and os.path.exists(os.path.join(path, META_FILE)):
+            meta = _read_meta(path)
+        elif os.path.exists(os.path.join(path, META_FILE)):
+            raise ValueError(f"封存已存在: {path}")
+        os.makedirs(path, exist_ok=True)
+        self.names = meta["players"] if meta else []
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.labels = meta["labels"] if meta else []
+        self.rows = {table: meta["rows"].get(table, 0) if meta else 0 for table in TABLES}
+        self.files = {}
+        for table, columns in TABLES.items():
+            for column, _ in columns:
+                file_path = _column_path(path, table, column)
+                existing = meta and os.path.exists(file_path)
+                f = open(file_path, 'r+b' if existing else 'wb')
+                if existing:
+                    # Drop anything a crashed writer left past the committed rows
+                    f.truncate(self.rows[table] * np.dtype(dict(columns)[column]).itemsize)
+                    f.seek(0, os.SEEK_END)
+                self.files[(table, column)] = f
+
+    def player_id(self, name):
+        player_id = self.index.get(name)
+        if player_id is None:
+            player_id = self.index[name] = len(self.names)
+            self.names.append(name)
+        return player_id
+
+    def _append(self, table, values):
+        for column, dtype in TABLES[table]:
+            np.asarray(values[column], dtype=dtype).tofile(self.files[(table, column)])
+        self.rows[table] += len(values[TABLES[table][0][0]])
+
+    def add_event(self, match_rows, standings_rows=(), label=None, roster=()):
+        # match_rows: (round, player1, player2, result) as in match_history;
+        # standings_rows: (rank, name, points, wins, losses, ties, omw, oomw);
+        # roster: names in engine id order
+        event = len(self.labels)
+        player_id = self.player_id
+        rounds = []
+        player1 = []
+        player2 = []
+        results = []
+        for round_num, name1, name2, result in match_rows:
+            rounds.append(int(round_num))
+            player1.append(player_id(name1))
+            if name2 == BYE:
+                player2.append(-1)
+                results.append(RESULT_BYE)
+                continue
+            player2.append(player_id(name2))
+            if result == DOUBLE_LOSS:
+                results.append(RESULT_DOUBLE_LOSS)
+            elif result == name1:
+                results.append(RESULT_P1_WIN)
+            elif result == name2:
+                results.append(RESULT_P2_WIN)
+            else:
+                raise ValueError(f"無效的結果: {name1} vs {name2} -> {result}")
+        standings = {column: [] for column, _ in STANDINGS_COLUMNS}
+        for rank, name, points, wins, losses, ties, omw, oomw in standings_rows:
+            for column, value in (("event", event), ("rank", rank), ("player", player_id(name)), ("points", points),
+                                  ("wins", wins), ("losses", losses), ("ties", ties), ("omw", omw),
+                                  ("oomw", math.nan if oomw is None else oomw)):
+                standings[column].append(value)
+
+        self._append("events", {"match_start": [self.rows["matches"]], "standings_start": [self.rows["standings"]],
+                                "rounds": [max(rounds, default=0)]})
+        self._append("matches", {"event": [event] * len(rounds), "round": rounds, "player1": player1,
+                                 "player2": player2, "result": results})
+        self._append("standings", standings)
+        self._append("roster", {"event": [event] * len(roster), "player": [player_id(name) for name in roster]})
+        self.labels.append(label if label is not None else f"event-{event}")
+        return event
+
+    def add_engine(self, engine, label=None):
+        tiebreaks = engine.tiebreaks()
+        standings = [(rank, p.name, p.points, p.wins, p.losses, p.ties, tiebreaks.omw[p.id], tiebreaks.oomw[p.id])
+                     for rank, p in enumerate(engine.standings(), 1)]
+        return self.add_event(engine.match_history, standings, label, [p.name for p in engine.players])
+
+    def add_csv(self, filename, label=None):
+        match_rows = []
+        standings = []
+        roster = ()
+        with open(filename, newline='', encoding='utf-8') as f:
+            for round_num, rows in iter_csv_rounds(f):
+                if round_num == "roster":
+                    roster = rows
+                elif round_num == "standings":
+                    for row in rows:
+                        oomw = float(row[7]) if len(row) > 7 and row[7] else None
+                        standings.append((int(row[0]), row[1], int(row[2]), int(row[3]), int(row[4]), int(row[5]),
+                                          float(row[6]), oomw))
+                else:
+                    match_rows.extend((round_num, name1, name2, result) for name1, name2, result in rows)
+        return self.add_event(match_rows, standings, label if label is not None else os.path.basename(filename), roster)
+
+    def close(self):
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        self.files = {}
+        meta = {"version": ARCHIVE_VERSION, "rows": self.rows, "players": self.names, "labels": self.labels,
+                "columns": {table: dict(columns) for table, columns in TABLES.items()}}
+        meta_path = os.path.join(self.path, META_FILE)
+        with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Archive:
+    # Read-only view; archive.matches["result"] etc. are memory-mapped arrays
+    def __init__(self, path):
+        self.path = path
+        meta = _read_meta(path)
+        self.names = meta["players"]
+        self.labels = meta["labels"]
+        self.index = None
+        self.matches = self._map("matches", meta["rows"]["matches"])
+        self.standings = self._map("standings", meta["rows"]["standings"])
+        self.events = self._map("events", meta["rows"]["events"])
+        self.roster = self._map("roster", meta["rows"].get("roster", 0))
+
+    def _map(self, table, rows):
+        columns = {}
+        for column, dtype in TABLES[table]:
+            if rows == 0:
+                columns[column] = np.zeros(0, dtype=dtype)
+            else:
+                columns[column] = np.memmap(_column_path(self.path, table, column), dtype=dtype, mode='r', shape=(rows,))
+        return columns
+
+    def __len__(self):
+        return len(self.labels)
+
+    def player_id(self, name):
+        if self.index is None:
+            self.index = {name: i for i, name in enumerate(self.names)}
+        player_id = self.index.get(name)
+        if player_id is None:
+            raise ValueError(f"找不到玩家: {name}")
+        return player_id
+
+    def _bounds(self, event, table):
+        if not 0 <= event < len(self):
+            raise ValueError(f"找不到賽事: {event}")
+        if table == "matches":
+            starts, rows = self.events["match_start"], len(self.matches["event"])
+        else:
+            starts, rows = self.events["standings_start"], len(self.standings["event"])
+        end = starts[event + 1] if event + 1 < len(self) else rows
+        return int(starts[event]), int(end)
+
+    def event_matches(self, event):
+        # Column slices (views, no copy) of one event's matches
+        start, end = self._bounds(event, "matches")
+        return {column: values[start:end] for column, values in self.matches.items()}
+
+    def event_standings(self, event):
+        start, end = self._bounds(event, "standings")
+        return {column: values[start:end] for column, values in self.standings.items()}
+
+    def event_roster(self, event):
+        # Player ids of one event in engine id order; empty if not recorded.
+        # Roster rows are sorted by event, so no start column is needed.
+        if not 0 <= event < len(self):
+            raise ValueError(f"找不到賽事: {event}")
+        events = self.roster["event"]
+        start, end = np.searchsorted(events, [event, event + 1])
+        return self.roster["player"][start:end]
+
+    def player_matches(self, name):
+        # Row numbers of every match or bye name played, in archive order
+        player_id = self.player_id(name)
+        return np.flatnonzero((self.matches["player1"] == player_id) | (self.matches["player2"] == player_id))
+
+    def write_csv(self, event, csvfile):
+        # The same layout as swiss_csv.write_csv
+        names = self.names
+        matches = self.event_matches(event)
+        writer = csv.writer(csvfile)
+        writer.writerow(MATCH_FIELDS)
+        for round_num, p1, p2, result in zip(matches["round"].tolist(), matches["player1"].tolist(),
+                                             matches["player2"].tolist(), matches["result"].tolist()):
+            name1 = names[p1]
+            if result == RESULT_BYE:
+                writer.writerow((round_num, name1, BYE, BYE_RESULT))
+                continue
+            name2 = names[p2]
+            text = DOUBLE_LOSS if result == RESULT_DOUBLE_LOSS else name1 if result == RESULT_P1_WIN else name2
+            writer.writerow((round_num, name1, name2, text))
+        standings = self.event_standings(event)
+        if len(standings["rank"]):
+            csvfile.write(f"\n{STANDINGS_TITLE}\n")
+            csvfile.write(STANDINGS_HEADER + "\n")
+            for rank, player, points, wins, losses, ties, omw, oomw in zip(
+                    *(standings[column].tolist() for column in ("rank", "player", "points", "wins", "losses", "ties", "omw", "oomw"))):
+                csvfile.write(format_standings_row(rank, names[player], points, wins, losses, ties, omw,
+                                                   None if math.isnan(oomw) else oomw))
+        roster = self.event_roster(event)
+        if len(roster):
+            csvfile.write(f"\n{ROSTER_TITLE}\n")
+            roster_writer = csv.writer(csvfile, lineterminator="\n")
+            roster_writer.writerow(ROSTER_FIELDS)
+            roster_writer.writerows((i, names[player]) for i, player in enumerate(roster.tolist()))
+
+    def export_csv(self, event, filename):
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            self.write_csv(event, f)
+
+def pack(path, filenames, append=False):
+    with ArchiveWriter(path, append) as writer:
+        for filename in filenames:
+            writer.add_csv(filename)
+    return len(filenames)
+
+def unpack(path, directory):
+    archive = Archive(path)
+    os.makedirs(directory, exist_ok=True)
+    for event, label in enumerate(archive.labels):
+        filename = label if label.lower().endswith(".csv") else f"{label}.csv"
+        archive.export_csv(event, os.path.join(directory, filename))
+    return len(archive)
+
+def main():
+    parser = argparse.ArgumentParser(description="瑞士輪賽事封存（欄式、記憶體映射）")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack_parser = commands.add_parser("pack", help="將匯出的 CSV 檔加入封存")
+    pack_parser.add_argument("archive")
+    pack_parser.add_argument("files", nargs="+")
+    pack_parser.add_argument("--append", action="store_true", help="加入既有封存")
+    unpack_parser = commands.add_parser("unpack", help="將封存還原為 CSV 檔")
+    unpack_parser.add_argument("archive")
+    unpack_parser.add_argument("directory")
+    info_parser = commands.add_parser("info", help="顯示封存摘要")
+    info_parser.add_argument("archive")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        count = pack(args.archive, args.files, args.append)
+        print(f"已封存 {count} 場賽事至 {args.archive}")
+    elif args.command == "unpack":
+        count = unpack(args.archive, args.directory)
+        print(f"已還原 {count} 場賽事至 {args.directory}")
+    else:
+        archive = Archive(args.archive)
+        results = np.bincount(archive.matches["result"], minlength=RESULT_BYE + 1)
+        print(f"{len(archive)} 場賽事，{len(archive.matches['event'])} 場比賽，{len(archive.names)} 名玩家")
+        print(f"先手勝 {results[RESULT_P1_WIN]}，後手勝 {results[RESULT_P2_WIN]}，"
+              f"雙敗 {results[RESULT_DOUBLE_LOSS]}，輪空 {results[RESULT_BYE]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+from swiss_csv import export_csv
+from swiss_engine import TournamentEngine, DOUBLE_LOSS
+from swiss_pairing import PAIRING_GREEDY, PAIRING_MATCHING
+
+# Headless benchmarks for the phases the GUI runs every round: pairing,
+# recording results, OMW for every player, the standings sort, and the CSV
+# export at the end. Events are synthetic and seeded, so two runs on the same
+# machine play identical tournaments.
+#
+#   python swiss_bench.py --players 16 256 4096 100000 --rounds 3 8 15 --save baseline.json
+#   python swiss_bench.py --compare baseline.json
+#
+# Timings come from an untraced run; peak memory from a second run under
+# tracemalloc (skip it with --no-memory), since tracing slows Python down.
+
+PHASES = ["pairing", "results", "omw", "standings", "export"]
+DEFAULT_PLAYERS = [16, 256, 4096, 100000]
+DEFAULT_ROUNDS = [3, 8, 15]
+# --compare flags a phase this much slower than the baseline
+DEFAULT_TOLERANCE = 0.25
+# Phases faster than this in the baseline are reported but never flagged;
+# at that scale the ratio is mostly timer noise
+MIN_COMPARE_SECONDS = 0.005
+
+class PhaseTimer:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.items = dict.fromkeys(PHASES, 0)
+        self.peak = dict.fromkeys(PHASES, 0)
+
+    def run(self, phase, items, func, *args):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = func(*args)
+        self.seconds[phase] += time.perf_counter() - start
+        self.items[phase] += items
+        if self.trace_memory:
+            self.peak[phase] = max(self.peak[phase], tracemalloc.get_traced_memory()[1] - base)
+        return result
+
+def play_event(n_players, rounds, seed, pairing_mode, timer):
+    rng = random.Random(f"{seed}:{n_players}:{rounds}")
+    engine = TournamentEngine(rounds, seed=rng.getrandbits(64), pairing_mode=pairing_mode)
+    engine.setup([f"P{i:06d}" for i in range(n_players)], rounds)
+
+    def all_omw():
+        for player in engine.players:
+            engine.get_omw(player)
+
+    while not engine.is_finished():
+        paired = timer.run("pairing", n_players, engine.start_round)
+        results = [DOUBLE_LOSS if rng.random() < 0.02 else rng.choice((p1.name, p2.name)) for p1, p2 in paired]
+        timer.run("results", len(results), engine.record_results, results)
+        timer.run("omw", n_players, all_omw)
+        timer.run("standings", n_players, engine.standings)
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        timer.run("export", len(engine.match_history) + n_players, export_csv, engine, path)
+    finally:
+        os.remove(path)
+
+def bench(n_players, rounds, seed=0, pairing_mode=PAIRING_GREEDY, memory=True):
+    timer = PhaseTimer()
+    play_event(n_players, rounds, seed, pairing_mode, timer)
+    phases = {}
+    for phase in PHASES:
+        seconds = timer.seconds[phase]
+        phases[phase] = {
+            "seconds": seconds,
+            "items": timer.items[phase],
+            "per_second": timer.items[phase] / seconds if seconds else 0.0
+        }
+
+    if memory:
+        traced = PhaseTimer(trace_memory=True)
+        tracemalloc.start()
+        try:
+            play_event(n_players, rounds, seed, pairing_mode, traced)
+            total_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        for phase in PHASES:
+            phases[phase]["peak_kb"] = traced.peak[phase] / 1024
+    return {
+        "players": n_players,
+        "rounds": rounds,
+        "total_seconds": sum(timer.seconds.values()),
+        "peak_kb": total_peak / 1024 if memory else None,
+        "phases": phases
+    }
+
+def run_suite(players, rounds, seed=0, pairing_mode=PAIRING_GREEDY, memory=True, report=None):
+    results = {}
+    for n_players in players:
+        for n_rounds in rounds:
+            case = bench(n_players, n_rounds, seed, pairing_mode, memory)
+            results[f"{n_players}x{n_rounds}"] = case
+            if report:
+                report(case)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "pairing": pairing_mode,
+            "seed": seed,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+def compare(current, baseline):
+    # [(case, phase, baseline_seconds, current_seconds, ratio)] for phases
+    # present in both runs
+    rows = []
+    for key, case in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        for phase in PHASES:
+            old_seconds = old["phases"][phase]["seconds"]
+            new_seconds = case["phases"][phase]["seconds"]
+            if old_seconds > 0:
+                rows.append((key, phase, old_seconds, new_seconds, new_seconds / old_seconds))
+    return rows
+
+def print_case(case):
+    print(f"\n{case['players']} 人 × {case['rounds']} 輪，共 {case['total_seconds']:.3f} 秒"
+          + (f"，記憶體峰值 {case['peak_kb'] / 1024:.1f} MB" if case["peak_kb"] is not None else ""))
+    for phase in PHASES:
+        data = case["phases"][phase]
+        peak = f"{data['peak_kb']:>10.0f} KB" if "peak_kb" in data else ""
+        print(f"  {phase:<10} {data['seconds']:>9.4f} s {data['per_second']:>14,.0f} /s {peak}")
+
+def main():
+    parser = argparse.ArgumentParser(description="瑞士輪效能基準測試")
+    parser.add_argument("--players", type=int, nargs="+", default=DEFAULT_PLAYERS)
+    parser.add_argument("--rounds", type=int, nargs="+", default=DEFAULT_ROUNDS)
+    parser.add_argument("--pairing", choices=[PAIRING_GREEDY, PAIRING_MATCHING], default=PAIRING_GREEDY)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="不量測記憶體峰值（節省一半時間）")
+    parser.add_argument("--save", help="將結果寫入 JSON 基準檔")
+    parser.add_argument("--compare", help="與先前儲存的 JSON 基準檔比較")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="比較時允許的變慢比例")
+    args = parser.parse_args()
+
+    baseline = None
+    players, rounds = args.players, args.rounds
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if players == DEFAULT_PLAYERS and rounds == DEFAULT_ROUNDS:
+            # Re-run exactly the cases the baseline has
+            players = sorted({case["players"] for case in baseline["results"].values()})
+            rounds = sorted({case["rounds"] for case in baseline["results"].values()})
+
+    current = run_suite(players, rounds, args.seed, args.pairing, not args.no_memory, print_case)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    if baseline is not None:
+        rows = compare(current, baseline)
+        regressions = [row for row in rows if row[4] > 1 + args.tolerance and row[2] >= MIN_COMPARE_SECONDS]
+        print(f"\n與 {args.compare} 比較（{baseline['meta'].get('time', '')}）：")
+        for row in rows:
+            key, phase, old_seconds, new_seconds, ratio = row
+            mark = "  <-- 變慢" if row in regressions else ""
+            print(f"  {key:<12} {phase:<10} {old_seconds:>9.4f} s -> {new_seconds:>9.4f} s  ×{ratio:.2f}{mark}")
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import csv
+import os
+import shutil
+
+from swiss_engine import TournamentEngine, BYE, BYE_RESULT
+
+# CSV layout written by SwissSimulatorGUI.export_to_csv:
+#
+#   Round,Player1,Player2,Result       one row per match or bye, in play order
+#   <blank line>
+#   Final Standings
+#   Rank,Player,Points,Wins,Losses,Ties,OMW,OOMW
+#   <blank line>
+#   Players
+#   Id,Player                          every player in engine id order
+#
+# CsvRoundWriter streams the match rows as each round's results come in and
+# writes the standings once at the end (the GUI's auto-updated export and the
+# server's export.csv per journaled event); import_csv reads a file back one
+# round at a time and replays it into a TournamentEngine. The roster keeps
+# the players' ids, which break ties in the standings and so steer pairing;
+# files from before it get ids in order of first appearance.
+
+MATCH_FIELDS = ['Round', 'Player1', 'Player2', 'Result']
+STANDINGS_TITLE = "Final Standings"
+STANDINGS_HEADER = "Rank,Player,Points,Wins,Losses,Ties,OMW,OOMW"
+ROSTER_TITLE = "Players"
+ROSTER_FIELDS = ['Id', 'Player']
+
+# Rows written between should_stop() checks
+EXPORT_CHUNK = 1024
+
+def write_standings(csvfile, engine, should_stop=None):
+    csvfile.write(f"\n{STANDINGS_TITLE}\n")
+    csvfile.write(STANDINGS_HEADER + "\n")
+    # Both tiebreaks for the whole field come from one pass
+    tiebreaks = engine.tiebreaks()
+    omw = tiebreaks.omw
+    oomw = tiebreaks.oomw
+    for i, player in enumerate(engine.standings(), 1):
+        if should_stop is not None and i % EXPORT_CHUNK == 0 and should_stop():
+            return False
+        csvfile.write(format_standings_row(i, player.name, player.points, player.wins, player.losses, player.ties,
+                                           omw[player.id], oomw[player.id]))
+    return True
+
+def write_roster(csvfile, engine, should_stop=None):
+    csvfile.write(f"\n{ROSTER_TITLE}\n")
+    writer = csv.writer(csvfile, lineterminator="\n")
+    writer.writerow(ROSTER_FIELDS)
+    players = engine.players
+    for start in range(0, len(players), EXPORT_CHUNK):
+        if should_stop is not None and start and should_stop():
+            return False
+        writer.writerows((p.id, p.name) for p in players[start:start + EXPORT_CHUNK])
+    return True
+
+def format_standings_row(rank, name, points, wins, losses, ties, omw, oomw):
+    # One line under STANDINGS_HEADER; oomw is None for files from before
+    # the OOMW column
+    oomw_text = "" if oomw is None else f"{oomw:.2f}"
+    if any(c in name for c in ',"\r\n'):
+        # Quoted the way csv.writer does, so the row still reads back
+        name = '"' + name.replace('"', '""') + '"'
+    return f"{rank},{name},{points},{wins},{losses},{ties},{omw:.2f},{oomw_text}\n"
+
+def confirmed_length(engine):
+    # Rows of match_history without the bye of a round whose results are
+    # still open, so every round in a file is a finished one
+    history = engine.match_history
+    end = len(history)
+    if not engine.results_confirmed:
+        while end and history[end - 1][0] == engine.current_round:
+            end -= 1
+    return end
+
+def confirmed_history(engine):
+    return engine.match_history[:confirmed_length(engine)]
+
+def write_csv(csvfile, engine, should_stop=None):
+    # Writes the whole export to an open text file (or io.StringIO); returns
+    # False if should_stop() asked to give up part way
+    writer = csv.writer(csvfile)
+    writer.writerow(MATCH_FIELDS)
+    history = confirmed_history(engine)
+    for start in range(0, len(history), EXPORT_CHUNK):
+        if should_stop is not None and should_stop():
+            return False
+        writer.writerows(history[start:start + EXPORT_CHUNK])
+    return write_standings(csvfile, engine, should_stop) and write_roster(csvfile, engine, should_stop)
+
+def export_csv(engine, filename, should_stop=None):
+    # Returns False if should_stop() asked to give up part way; the partial
+    # file is removed
+    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        complete = write_csv(csvfile, engine, should_stop)
+    if not complete:
+        os.remove(filename)
+    return complete
+
+class CsvRoundWriter:
+    # Engine listener that appends each round to the CSV once its results are
+    # recorded; close() adds the standings. An undo that takes back written
+    # results, a restore or a new setup rewrites the file from match_history.
+    def __init__(self, engine, filename):
+        self.engine = engine
+        self.filename = filename
+        self.file = open(filename, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.rewrite()
+        engine.listeners.append(self.on_event)
+
+    def rewrite(self):
+        history = confirmed_history(self.engine)
+        self.file.seek(0)
+        self.file.truncate()
+        self.writer.writerow(MATCH_FIELDS)
+        self.writer.writerows(history)
+        self.written = len(history)
+        self.file.flush()
+
+    def on_event(self, event):
+        kind = event["type"]
+        if kind == "results":
+            history = self.engine.match_history
+            self.writer.writerows(history[self.written:])
+            self.written = len(history)
+            self.file.flush()
+        elif kind == "revert":
+            # Undoing a pairing only drops an unwritten bye
+            if confirmed_length(self.engine) < self.written:
+                self.rewrite()
+        elif kind in ("restore", "setup", "reset"):
+            self.rewrite()
+
+    def write_export(self, csvfile):
+        # The same text as write_csv; the match rows are copied from the file
+        # instead of formatted again
+        with open(self.filename, newline='', encoding='utf-8') as f:
+            shutil.copyfileobj(f, csvfile)
+        write_standings(csvfile, self.engine)
+        write_roster(csvfile, self.engine)
+
+    def close(self, standings=True):
+        if self.on_event in self.engine.listeners:
+            self.engine.listeners.remove(self.on_event)
+        if standings:
+            write_standings(self.file, self.engine)
+            write_roster(self.file, self.engine)
+        self.file.close()
+
+def iter_csv_rounds(lines):
+    # Yields (round, [(player1, player2, result), ...]) in file order, then
+    # ("standings", [row, ...]) and ("roster", [name, ...]) for the sections
+    # the file has. Only one round is held in memory at a time.
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header != MATCH_FIELDS:
+        raise ValueError("不是瑞士輪匯出的 CSV 檔案！")
+    current = None
+    rows = []
+    for row in reader:
+        if not row:
+            continue
+        if row[0] == STANDINGS_TITLE:
+            break
+        round_num = int(row[0])
+        if round_num != current:
+            if rows:
+                yield current, rows
+            current = round_num
+            rows = []
+        rows.append((row[1], row[2], row[3]))
+    if rows:
+        yield current, rows
+
+    standings = []
+    roster = None
+    for row in reader:
+        if not row or row[0] == "Rank":
+            continue
+        if row[0] == ROSTER_TITLE:
+            roster = read_roster_rows(reader)
+            break
+        standings.append(row)
+    if standings:
+        yield "standings", standings
+    if roster:
+        yield "roster", roster
+
+def read_roster_rows(reader):
+    return [row[1] for row in reader if row and row != ROSTER_FIELDS]
+
+def read_roster(lines):
+    # Names in id order from the roster section, or None if there is none.
+    # Skips the rest of the file line by line without parsing it.
+    for line in lines:
+        if line.rstrip("\r\n") == ROSTER_TITLE:
+            return read_roster_rows(csv.reader(lines))
+    return None
+
+def import_csv(filename, rounds=None):
+    # Rebuilds players, opponents, byes and match history from an export.
+    # Returns a new engine positioned after the last completed round; pass
+    # rounds to resume an event whose total was longer than what was played.
+    engine = TournamentEngine()
+    last_round = 0
+    with open(filename, newline='', encoding='utf-8') as f:
+        # Players go in with their original ids before anything is replayed
+        for name in read_roster(f) or []:
+            engine.add_player(name)
+        f.seek(0)
+        for round_num, rows in iter_csv_rounds(f):
+            if round_num == "roster":
+                continue
+            if round_num == "standings":
+                for row in rows:
+                    if row[1] not in engine.name_index:
+                        engine.add_player(row[1])
+                continue
+            paired = []
+            results = []
+            bye_player = None
+            for p1_name, p2_name, result in rows:
+                p1 = engine.name_index.get(p1_name) or engine.add_player(p1_name)
+                if p2_name == BYE and result == BYE_RESULT:
+                    bye_player = p1
+                    continue
+                p2 = engine.name_index.get(p2_name) or engine.add_player(p2_name)
+                paired.append((p1, p2))
+                results.append(result)
+            # A round can be only a bye when nobody left has a legal opponent
+            engine.load_round(round_num, paired, bye_player)
+            engine.record_results(results)
+            last_round = round_num
+    engine.rounds = max(rounds or 0, last_round)
+    return engine
@@ -0,0 +1,641 @@
+import math
+import random
+import re
+from contextlib import nullcontext
+
+from swiss_history import OP_CUSTOM, OP_RESULTS, OP_ROUND, History
+from swiss_instrument import from_environment
+from swiss_standings import StandingsIndex
+from swiss_tiebreak import (
+    compute_tiebreaks, match_win_percent, omw_value, oomw_value, opponent_win_share, tiebreak_scale,
+)
+from swiss_pairing import (
+    MATCHING_TIME_BUDGET, PAIRING_GREEDY, PAIRING_MATCHING, PairingTimeout, PlayedPairs,
+    pair_max_weight, pair_score_groups,
+)
+
+DOUBLE_LOSS = "雙敗"
+BYE = "輪空"
+BYE_RESULT = "自動獲勝"
+
+# Compact result codes for journals and columnar storage
+RESULT_P1_WIN = 1
+RESULT_P2_WIN = 2
+RESULT_DOUBLE_LOSS = 3
+RESULT_BYE = 4
+
+class Player:
+    def __init__(self, name, player_id=0):
+        self.name = name
+        self.id = player_id
+        self.points = 0
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+        self.byes = 0
+        self.opponents = []
+        # Running sum of the opponents' floored match-win percentages times
+        # 3 x the engine's tiebreak_scale, an exact integer (see
+        # swiss_tiebreak). Kept current by add_opponent/record so OMW never
+        # has to walk self.opponents.
+        self.opponent_win_sum = 0
+
+    def __str__(self):
+        return f"{self.name} ({self.points}分, {self.wins}-{self.losses})"
+
+    def win_percent(self):
+        return match_win_percent(self.wins, self.losses, self.ties)
+
+    def opponent_win_share(self):
+        # This player's share of an opponent's OMW (floored, see swiss_tiebreak)
+        return opponent_win_share(self.wins, self.losses, self.ties)
+
+    def opponent_win_units(self, scale):
+        # The share times 3 x scale
+        numerator, played = self.opponent_win_share()
+        return numerator * (scale // played)
+
+    def add_opponent(self, opp, scale):
+        self.opponents.append(opp)
+        self.opponent_win_sum += opp.opponent_win_units(scale)
+
+    def reset_opponent_win_sum(self, scale):
+        self.opponent_win_sum = sum(opp.opponent_win_units(scale) for opp in self.opponents)
+
+    def record(self, scale, wins=0, losses=0, points=0, ties=0):
+        # All changes to a player's record go through here so that the
+        # cached sums of everyone who has played this player stay in step.
+        # scale must already cover the new played count.
+        old_units = self.opponent_win_units(scale)
+        self.wins += wins
+        self.losses += losses
+        self.ties += ties
+        self.points += points
+        delta = self.opponent_win_units(scale) - old_units
+        if delta:
+            for opp in self.opponents:
+                opp.opponent_win_sum += delta
+
+    def omw_units(self, scale):
+        # Exact OMW over 3 x scale^2
+        if not self.opponents:
+            return 0
+        return self.opponent_win_sum * (scale // len(self.opponents))
+
+    def get_omw(self, all_players=None, current_round=None):
+        # Exact from the opponents' records; the engine reads the running sum
+        if not self.opponents or current_round == 0:
+            return 0.0
+        shares = [opp.opponent_win_share() for opp in self.opponents]
+        scale = math.lcm(len(shares), *(played for _, played in shares))
+        total = sum(numerator * (scale // played) for numerator, played in shares)
+        return omw_value(total * (scale // len(shares)), scale)
+
+class TournamentEngine:
+    # Pure tournament state and rules, no Tk. The GUI is a view over this.
+    def __init__(self, rounds=0, seed=None, pairing_mode=PAIRING_GREEDY):
+        self.rng = random.Random(seed)
+        self.pairing_mode = pairing_mode
+        self.matching_time_budget = MATCHING_TIME_BUDGET
+        # {name: rating} to seed round 1 by strength instead of at random
+        # (see swiss_rating); unknown names count as the lowest rating given
+        self.seed_ratings = None
+        # Callables receiving an event dict for every setup, late
+        # registration, custom pairing, round, result batch and reset (see
+        # swiss_journal)
+        self.listeners = []
+        # swiss_instrument.Instruments, or None (the default) for no overhead
+        self.instruments = from_environment()
+        self.clear()
+        self.rounds = rounds
+
+    def emit(self, event):
+        for listener in self.listeners:
+            listener(event)
+
+    def reset(self):
+        self.clear()
+        self.emit({"type": "reset"})
+
+    def clear(self):
+        self.players = []
+        self.name_index = {}
+        # OOMW in the key reaches two levels of opponents
+        self.standings_index = StandingsIndex(self.players, self.standings_key, self.standings_keys, depth=2)
+        self.played = PlayedPairs()
+        # Most matches plus byes of any player so far, and the tiebreak
+        # denominator that covers it
+        self.max_played = 0
+        self.tiebreak_scale = 1
+        self.rounds = 0
+        self.current_round = 0
+        self.custom_pairs = []
+        self.paired_matches = []
+        self.match_history = []
+        self.bye_player = None
+        self.pairing_fell_back = False
+        self.results_confirmed = False
+        self.history = History()
+        # Drawn once per event, so a cancelled round 1 shuffles the same way
+        # when it is paired again
+        self.shuffle_seed = self.rng.getrandbits(64)
+
+    def setup(self, names, rounds):
+        names = [name.strip() for name in names if name.strip()]
+        if len(names) != len(set(names)):
+            raise ValueError("玩家姓名不得重複！")
+        if len(names) < 2:
+            raise ValueError("至少需要2名玩家！")
+        if rounds <= 0:
+            raise ValueError("請輸入有效的輪次數量（大於0）！")
+        self.clear()
+        self.rounds = rounds
+        for name in names:
+            self.add_player(name)
+        # The options go along so a replayed setup pairs the same way
+        self.emit({"type": "setup", "names": names, "rounds": rounds,
+                   "pairing_mode": self.pairing_mode, "seed_ratings": self.seed_ratings})
+
+    def add_players(self, names):
+        # Late registration before round 1; unlike setup the event so far
+        # carries on
+        if self.current_round > 0 or self.custom_pairs:
+            raise ValueError("賽事已開始，無法再報名！")
+        names = [name.strip() for name in names if name.strip()]
+        if len(names) != len(set(names)) or any(name in self.name_index for name in names):
+            raise ValueError("玩家姓名不得重複！")
+        for name in names:
+            self.add_player(name)
+        self.standings_index.invalidate()
+        self.emit({"type": "players", "names": names})
+
+    def add_player(self, name):
+        # Ids are dense, so self.players[player.id] is player
+        player = Player(name, len(self.players))
+        self.players.append(player)
+        self.name_index[name] = player
+        return player
+
+    def get_player(self, name):
+        return self.name_index[name]
+
+    def timer(self, name):
+        if self.instruments is None:
+            return nullcontext()
+        return self.instruments.timer(name)
+
+    def get_omw(self, player):
+        if self.instruments is not None:
+            self.instruments.counters["omw_evaluations"] += 1
+        return omw_value(self.get_omw_units(player), self.tiebreak_scale)
+
+    def get_omw_units(self, player):
+        # Exact OMW over 3 x tiebreak_scale^2 (see swiss_tiebreak)
+        if self.current_round == 0:
+            return 0
+        return player.omw_units(self.tiebreak_scale)
+
+    def get_oomw_units(self, player):
+        if not player.opponents:
+            return 0
+        scale = self.tiebreak_scale
+        return sum(self.get_omw_units(opp) for opp in player.opponents) * (scale // len(player.opponents))
+
+    def get_oomw(self, player):
+        return oomw_value(self.get_oomw_units(player), self.tiebreak_scale)
+
+    def cover_tiebreak_scale(self, count):
+        # Called before a player gains an opponent or a bye, the only ways
+        # their played or opponent count can grow, with the new count
+        if count > self.max_played:
+            self.max_played = count
+            scale = tiebreak_scale(count)
+            factor = scale // self.tiebreak_scale
+            self.tiebreak_scale = scale
+            if factor > 1:
+                for player in self.players:
+                    player.opponent_win_sum *= factor
+                # Every cached key is over the old scale
+                self.standings_index.invalidate()
+
+    def tiebreaks(self):
+        # OMW and OOMW of every player at once (swiss_tiebreak.Tiebreaks);
+        # cheaper than get_oomw per player when the whole field is needed
+        return compute_tiebreaks(self.players, self.get_omw_units, self.tiebreak_scale)
+
+    def standings_key(self, player):
+        return (-player.points, -self.get_omw_units(player), -self.get_oomw_units(player), player.id)
+
+    def standings_keys(self):
+        # standings_key for every player, from one tiebreak pass
+        tiebreaks = self.tiebreaks()
+        omw = tiebreaks.omw_units
+        oomw = tiebreaks.oomw_units
+        return [(-p.points, -omw[p.id], -oomw[p.id], p.id) for p in self.players]
+
+    def standings(self):
+        # Points, then OMW, then OOMW, high to low; maintained by
+        # standings_index rather than sorted from scratch on every call
+        with self.timer("standings"):
+            return self.standings_index.standings()
+
+    def rank(self, player):
+        return self.standings_index.rank(player)
+
+    def top(self, n):
+        return self.standings_index.top(n)
+
+    def is_finished(self):
+        return self.current_round >= self.rounds
+
+    def add_match(self, p1, p2):
+        self.cover_tiebreak_scale(max(len(p1.opponents) + p1.byes, len(p2.opponents) + p2.byes) + 1)
+        p1.add_opponent(p2, self.tiebreak_scale)
+        p2.add_opponent(p1, self.tiebreak_scale)
+        self.played.add(p1.id, p2.id)
+        self.standings_index.mark(p1)
+        self.standings_index.mark(p2)
+
+    def award_bye(self, player, round_num):
+        self.cover_tiebreak_scale(len(player.opponents) + player.byes + 1)
+        player.record(self.tiebreak_scale, wins=1, points=1)
+        player.byes += 1
+        self.standings_index.mark(player)
+        self.match_history.append((round_num, player.name, BYE, BYE_RESULT))
+        if self.instruments is not None:
+            self.instruments.count("byes")
+        self.bye_player = player
+
+    def set_custom_pairs(self, name_pairs):
+        # name_pairs: (p1_name, p2_name) for round 1; players left out are
+        # paired in list order, and an odd one out gets the bye right away.
+        if self.custom_pairs or self.current_round > 0:
+            raise ValueError("第一輪配對已設定！")
+        used_players = set()
+        selected = []
+        for p1_name, p2_name in name_pairs:
+            if p1_name and p2_name:
+                if p1_name == p2_name or p1_name in used_players or p2_name in used_players:
+                    raise ValueError("玩家不能重複使用！")
+                selected.append((self.get_player(p1_name), self.get_player(p2_name)))
+                used_players.add(p1_name)
+                used_players.add(p2_name)
+
+        if len(used_players) != len(self.players) and len(used_players) + 1 != len(self.players):
+            raise ValueError("自訂配對未涵蓋所有玩家，請檢查！")
+
+        delta = self.capture_delta(self.players)
+        self.custom_pairs = []
+        self.bye_player = None
+        remaining = [p for p in self.players if p.name not in used_players]
+        for i in range(0, len(remaining) - 1, 2):
+            selected.append((remaining[i], remaining[i + 1]))
+        for p1, p2 in selected:
+            self.custom_pairs.append((p1, p2))
+            self.add_match(p1, p2)
+        if len(remaining) % 2 == 1:
+            self.award_bye(remaining[-1], 1)
+        self.history.record((OP_CUSTOM, tuple((p1.id, p2.id) for p1, p2 in self.custom_pairs)), delta, "自訂第一輪")
+        self.emit({"type": "custom", "pairs": [[p1.id, p2.id] for p1, p2 in self.custom_pairs]})
+        return self.bye_player
+
+    def parse_pair_lines(self, lines):
+        # Seeded first rounds from a file: one "player1, player2" (or
+        # "player1 vs player2") per line. Like parse_result_lines every line
+        # is checked and all problems are reported together. Returns name
+        # pairs for set_custom_pairs.
+        pairs = []
+        used = set()
+        errors = []
+        for line_no, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            parts = [part.strip() for part in re.split(r"[,，\t]|\s+vs\.?\s+", line, maxsplit=1)]
+            if len(parts) < 2 or not parts[0] or not parts[1]:
+                errors.append(f"第 {line_no} 行格式錯誤: {line}")
+                continue
+            unknown = [name for name in parts if name not in self.name_index]
+            if unknown:
+                errors.append(f"第 {line_no} 行找不到玩家: {', '.join(unknown)}")
+            elif parts[0] == parts[1] or parts[0] in used or parts[1] in used:
+                errors.append(f"第 {line_no} 行玩家重複: {line}")
+            else:
+                used.update(parts)
+                pairs.append((parts[0], parts[1]))
+        if errors:
+            more = f"\n…共 {len(errors)} 個錯誤" if len(errors) > 20 else ""
+            raise ValueError("\n".join(errors[:20]) + more)
+        return pairs
+
+    def compute_pairings(self, round_num, mode=None, should_stop=None, progress=None):
+        # Works out a round without touching tournament state, so it can run
+        # on a worker thread and be abandoned; all it changes is the
+        # standings cache and the instruments' round record. mode is
+        # PAIRING_GREEDY or PAIRING_MATCHING (default self.pairing_mode);
+        # should_stop() turning true raises PairingCancelled and
+        # progress(fraction) is called as it goes. Returns (pairs, bye_player,
+        # fell_back).
+        if self.instruments is not None:
+            self.instruments.begin_round(round_num)
+        if round_num == 1 and self.custom_pairs:
+            return self.custom_pairs, None, False
+        if self.instruments is None:
+            return self._compute_pairings(round_num, mode, should_stop, progress, None)
+        with self.instruments.timer("pairing"):
+            return self._compute_pairings(round_num, mode, should_stop, progress, self.instruments.counters)
+
+    def _compute_pairings(self, round_num, mode, should_stop, progress, stats):
+        # Use OMW for sorting
+        players = self.standings()
+        if round_num == 1:
+            random.Random(self.shuffle_seed).shuffle(players)
+            if self.seed_ratings:
+                return self.seeded_first_round(players)
+
+        if (mode or self.pairing_mode) == PAIRING_MATCHING:
+            bye_eligible = {p.id for p in players if p.byes == 0}
+            try:
+                paired, bye_player = pair_max_weight(players, self.get_omw, self.played, bye_eligible,
+                                                     time_budget=self.matching_time_budget, should_stop=should_stop, progress=progress,
+                                                     stats=stats)
+                return paired, bye_player, False
+            except PairingTimeout:
+                paired, bye_player = pair_score_groups(players, self.get_omw, self.played, should_stop, progress, stats)
+                return paired, bye_player, True
+        paired, bye_player = pair_score_groups(players, self.get_omw, self.played, should_stop, progress, stats)
+        return paired, bye_player, False
+
+    def seeded_first_round(self, players):
+        # Top half against bottom half by rating (1st vs n/2+1st, ...); the
+        # lowest rated sits out an odd field. Equal ratings keep the shuffled
+        # order.
+        ratings = self.seed_ratings
+        lowest = min(ratings.values())
+        players = sorted(players, key=lambda p: -ratings.get(p.name, lowest))
+        bye_player = players.pop() if len(players) % 2 else None
+        half = len(players) // 2
+        return list(zip(players[:half], players[half:])), bye_player, False
+
+    def apply_pairings(self, round_num, paired, bye_player):
+        self.bye_player = None
+        if not (round_num == 1 and self.custom_pairs):
+            for p1, p2 in paired:
+                self.add_match(p1, p2)
+            if bye_player:
+                self.award_bye(bye_player, round_num)
+
+    def pair_players(self, round_num, mode=None):
+        paired, bye_player, fell_back = self.compute_pairings(round_num, mode)
+        self.apply_pairings(round_num, paired, bye_player)
+        self.pairing_fell_back = fell_back
+        return paired
+
+    def start_round(self, mode=None, should_stop=None, progress=None):
+        if self.current_round > 0 and not self.results_confirmed:
+            raise ValueError("請先確認當前輪次的比賽結果！")
+        # Only caches change until the pairings are complete (see
+        # compute_pairings), so a cancelled round leaves the tournament as it
+        # was and pairs the same way when tried again
+        paired, bye_player, fell_back = self.compute_pairings(self.current_round + 1, mode, should_stop, progress)
+        return self.load_round(self.current_round + 1, paired, bye_player, fell_back)
+
+    def load_round(self, round_num, paired, bye_player=None, fell_back=False):
+        # Applies a round that was already paired elsewhere (journal replay,
+        # imports, a GUI worker thread) without running the pairing rules again
+        touched = [p for pair in paired for p in pair]
+        if bye_player:
+            touched.append(bye_player)
+        delta = self.capture_delta(touched)
+        if (self.current_round == 0) != (round_num == 0):
+            # get_omw reads 0 for everyone before round 1
+            self.standings_index.invalidate()
+        self.current_round = round_num
+        self.results_confirmed = False
+        self.pairing_fell_back = fell_back
+        self.apply_pairings(round_num, paired, bye_player)
+        self.paired_matches = list(paired)
+        self.history.record((OP_ROUND, round_num, tuple((p1.id, p2.id) for p1, p2 in paired), bye_player.id if bye_player else None),
+                            delta, f"第 {round_num} 輪配對", {"fell_back": fell_back})
+        self.emit_round()
+        return self.paired_matches
+
+    def emit_round(self):
+        self.emit({
+            "type": "round",
+            "round": self.current_round,
+            "pairs": [[p1.id, p2.id] for p1, p2 in self.paired_matches],
+            "bye": self.bye_player.id if self.bye_player else None
+        })
+
+    def record_results(self, results):
+        # results[i] is the winner's name or DOUBLE_LOSS for paired_matches[i]
+        if len(results) != len(self.paired_matches) or "" in results:
+            raise ValueError("請為每場比賽選擇一個結果！")
+        for (p1, p2), result in zip(self.paired_matches, results):
+            if result not in (p1.name, p2.name, DOUBLE_LOSS):
+                raise ValueError(f"無效的結果: {p1.name} vs {p2.name} -> {result}")
+
+        delta = self.capture_delta([p for pair in self.paired_matches for p in pair])
+        scale = self.tiebreak_scale
+        with self.timer("record_results"):
+            for (p1, p2), result in zip(self.paired_matches, results):
+                if result == DOUBLE_LOSS:
+                    p1.record(scale, losses=1)
+                    p2.record(scale, losses=1)
+                else:
+                    winner = p1 if p1.name == result else p2
+                    loser = p2 if p1.name == result else p1
+                    winner.record(scale, wins=1, points=1)
+                    loser.record(scale, losses=1)
+                self.match_history.append((self.current_round, p1.name, p2.name, result))
+        self.standings_index.mark_matches(self.paired_matches)
+        self.results_confirmed = True
+        codes = self.result_codes(results)
+        self.history.record((OP_RESULTS, self.current_round, tuple(codes)), delta, f"第 {self.current_round} 輪結果")
+        self.emit({"type": "results", "round": self.current_round, "results": codes})
+
+    def parse_result_lines(self, lines):
+        # Bulk entry: one "table, winner" per line, tables numbered from 1 in
+        # paired_matches order and winner a player name or DOUBLE_LOSS. Every
+        # line is checked first and all problems are reported together.
+        results = [""] * len(self.paired_matches)
+        errors = []
+        for line_no, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            parts = re.split(r"[,，\t]", line, maxsplit=1)
+            if len(parts) < 2:
+                parts = line.split(None, 1)
+            if len(parts) < 2:
+                errors.append(f"第 {line_no} 行格式錯誤: {line}")
+                continue
+            table_text, result = parts[0].strip(), parts[1].strip()
+            if not table_text.isdigit() or not 1 <= int(table_text) <= len(results):
+                errors.append(f"第 {line_no} 行桌號無效: {table_text}")
+                continue
+            table = int(table_text)
+            p1, p2 = self.paired_matches[table - 1]
+            if results[table - 1]:
+                errors.append(f"第 {line_no} 行桌號重複: {table}")
+            elif result not in (p1.name, p2.name, DOUBLE_LOSS):
+                errors.append(f"第 {line_no} 行結果無效: 第 {table} 桌為 {p1.name} vs {p2.name}")
+            else:
+                results[table - 1] = result
+
+        missing = [str(i) for i, result in enumerate(results, 1) if not result]
+        if missing and not errors:
+            errors.append(f"缺少桌號: {', '.join(missing[:20])}" + (" …" if len(missing) > 20 else ""))
+        if errors:
+            more = f"\n…共 {len(errors)} 個錯誤" if len(errors) > 20 else ""
+            raise ValueError("\n".join(errors[:20]) + more)
+        return results
+
+    def result_codes(self, results):
+        codes = []
+        for (p1, p2), result in zip(self.paired_matches, results):
+            if result == DOUBLE_LOSS:
+                codes.append(RESULT_DOUBLE_LOSS)
+            else:
+                codes.append(RESULT_P1_WIN if result == p1.name else RESULT_P2_WIN)
+        return codes
+
+    def results_from_codes(self, codes):
+        results = []
+        for (p1, p2), code in zip(self.paired_matches, codes):
+            if code == RESULT_DOUBLE_LOSS:
+                results.append(DOUBLE_LOSS)
+            else:
+                results.append(p1.name if code == RESULT_P1_WIN else p2.name)
+        return results
+
+    def capture_delta(self, touched):
+        # What revert() needs to undo a change to the touched players: their
+        # record and opponent count, plus the engine's per-round fields.
+        # Plain data, so it can go into the journal.
+        return {
+            "players": [[p.id, p.points, p.wins, p.losses, p.ties, p.byes, len(p.opponents)] for p in touched],
+            "round": self.current_round,
+            "results_confirmed": self.results_confirmed,
+            "fell_back": self.pairing_fell_back,
+            "bye": self.bye_player.id if self.bye_player else None,
+            "paired": [[p1.id, p2.id] for p1, p2 in self.paired_matches],
+            "custom": [[p1.id, p2.id] for p1, p2 in self.custom_pairs],
+            "history": len(self.match_history)
+        }
+
+    def revert(self, delta):
+        # Puts back the state a delta was captured from and steps the version
+        # history back one. Cost is the touched players and their opponents.
+        players = self.players
+        touched = []
+        removed = []
+        for player_id, points, wins, losses, ties, byes, n_opponents in delta["players"]:
+            player = players[player_id]
+            removed.extend((player, opp) for opp in player.opponents[n_opponents:])
+            del player.opponents[n_opponents:]
+            player.points = points
+            player.wins = wins
+            player.losses = losses
+            player.ties = ties
+            player.byes = byes
+            touched.append(player)
+        for player, opp in removed:
+            # A rematch leaves the earlier meeting in place
+            if opp not in player.opponents:
+                self.played.remove(player.id, opp.id)
+        affected = set(touched)
+        for player in touched:
+            affected.update(player.opponents)
+        for player in affected:
+            player.reset_opponent_win_sum(self.tiebreak_scale)
+
+        if (self.current_round == 0) != (delta["round"] == 0):
+            self.standings_index.invalidate()
+        self.standings_index.mark_many(touched)
+        self.current_round = delta["round"]
+        self.results_confirmed = delta["results_confirmed"]
+        self.pairing_fell_back = delta["fell_back"]
+        self.bye_player = players[delta["bye"]] if delta["bye"] is not None else None
+        self.paired_matches = [(players[a], players[b]) for a, b in delta["paired"]]
+        self.custom_pairs = [(players[a], players[b]) for a, b in delta["custom"]]
+        del self.match_history[delta["history"]:]
+        self.history.step_back()
+
+    def undo(self):
+        if not self.history.can_undo():
+            raise ValueError("沒有可復原的操作！")
+        delta = self.history.current.delta
+        self.revert(delta)
+        self.emit({"type": "revert", "delta": delta})
+
+    def redo(self, version=None):
+        # Re-runs the operation of version (default: the branch last used)
+        version = version or self.history.current.active
+        if version is None:
+            raise ValueError("沒有可重做的操作！")
+        op = version.op
+        players = self.players
+        if op[0] == OP_CUSTOM:
+            self.set_custom_pairs([(players[a].name, players[b].name) for a, b in op[1]])
+        elif op[0] == OP_ROUND:
+            self.load_round(op[1], [(players[a], players[b]) for a, b in op[2]],
+                            players[op[3]] if op[3] is not None else None, version.extra.get("fell_back", False))
+        else:
+            self.record_results(self.results_from_codes(op[2]))
+
+    def checkout(self, version_id):
+        # Moves to any version, e.g. another branch after a "what if", by
+        # undoing up to the common ancestor and redoing down to it
+        target = self.history.get(version_id)
+        ancestor = self.history.common_ancestor(target)
+        while self.history.current is not ancestor:
+            self.undo()
+        for version in target.path()[len(ancestor.path()):]:
+            self.redo(version)
+
+    def snapshot(self):
+        # Plain-data copy of the whole state; restore() rebuilds from it
+        return {
+            "rounds": self.rounds,
+            "current_round": self.current_round,
+            "results_confirmed": self.results_confirmed,
+            "players": [[p.name, p.points, p.wins, p.losses, p.ties, p.byes, [o.id for o in p.opponents]] for p in self.players],
+            "custom_pairs": [[p1.id, p2.id] for p1, p2 in self.custom_pairs],
+            "paired_matches": [[p1.id, p2.id] for p1, p2 in self.paired_matches],
+            "bye": self.bye_player.id if self.bye_player else None,
+            "match_history": [list(match) for match in self.match_history],
+            "pairing_mode": self.pairing_mode,
+            "seed_ratings": self.seed_ratings
+        }
+
+    def restore(self, state):
+        self.clear()
+        self.rounds = state["rounds"]
+        self.current_round = state["current_round"]
+        self.results_confirmed = state["results_confirmed"]
+        for name, points, wins, losses, ties, byes, _ in state["players"]:
+            player = self.add_player(name)
+            player.points = points
+            player.wins = wins
+            player.losses = losses
+            player.ties = ties
+            player.byes = byes
+        players = self.players
+        for player, row in zip(players, state["players"]):
+            player.opponents = [players[i] for i in row[6]]
+            for opp in player.opponents:
+                self.played.add(player.id, opp.id)
+        self.cover_tiebreak_scale(max([len(p.opponents) + p.byes for p in players], default=0))
+        for player in players:
+            player.reset_opponent_win_sum(self.tiebreak_scale)
+        self.custom_pairs = [(players[a], players[b]) for a, b in state["custom_pairs"]]
+        self.paired_matches = [(players[a], players[b]) for a, b in state["paired_matches"]]
+        self.bye_player = players[state["bye"]] if state["bye"] is not None else None
+        self.match_history = [tuple(match) for match in state["match_history"]]
+        # Snapshots from before the options were kept leave them as they are
+        self.pairing_mode = state.get("pairing_mode", self.pairing_mode)
+        self.seed_ratings = state.get("seed_ratings", self.seed_ratings)
+        self.standings_index.invalidate()
+        self.emit({"type": "restore", "state": state})
@@ -0,0 +1,100 @@
+# Version tree for TournamentEngine undo/redo.
+#
+# Every change to an event (custom first round, pairing a round, recording a
+# round's results) becomes a Version holding the operation that produced it
+# and a delta: the previous points/record/opponent count of only the players
+# it touched plus the engine's own round fields. Undo applies the delta,
+# redo runs the operation again, so both cost the size of one round rather
+# than a copy of every Player. Doing something different after an undo starts
+# a new branch next to the old one instead of discarding it, and checkout()
+# can move between branches ("what if table 12 went the other way").
+#
+# Operations are plain tuples so identical ones compare equal; re-running one
+# (redo, or a journal replay) moves onto the existing version.
+
+OP_CUSTOM = "custom"
+OP_ROUND = "round"
+OP_RESULTS = "results"
+
+class Version:
+    def __init__(self, version_id, parent, op, delta, label):
+        self.id = version_id
+        self.parent = parent
+        self.op = op
+        self.delta = delta
+        self.label = label
+        self.children = []
+        # Child redo() follows: the one made or visited last
+        self.active = None
+        # Fields of the operation that do not make it a different version
+        self.extra = {}
+
+    def path(self):
+        # Versions from the root down to this one
+        node = self
+        path = []
+        while node is not None:
+            path.append(node)
+            node = node.parent
+        path.reverse()
+        return path
+
+class History:
+    def __init__(self):
+        self.root = Version(0, None, None, None, "開始")
+        self.current = self.root
+        self.versions = {0: self.root}
+
+    def record(self, op, delta, label, extra=None):
+        node = self.current
+        for child in node.children:
+            if child.op == op:
+                break
+        else:
+            child = Version(len(self.versions), node, op, delta, label)
+            self.versions[child.id] = child
+            node.children.append(child)
+        child.delta = delta
+        child.extra = extra or {}
+        node.active = child
+        self.current = child
+        return child
+
+    def can_undo(self):
+        return self.current.parent is not None
+
+    def can_redo(self):
+        return self.current.active is not None
+
+    def step_back(self):
+        # Called after the engine has reverted current.delta
+        node = self.current
+        if node.parent is not None:
+            node.parent.active = node
+            self.current = node.parent
+        return node
+
+    def get(self, version_id):
+        version = self.versions.get(version_id)
+        if version is None:
+            raise ValueError(f"找不到版本: {version_id}")
+        return version
+
+    def common_ancestor(self, version):
+        ancestors = {node.id for node in self.current.path()}
+        for node in reversed(version.path()):
+            if node.id in ancestors:
+                return node
+        return self.root
+
+    def branches(self):
+        # (version, depth, is_current_path) in tree order, for listings
+        on_path = {node.id for node in self.current.path()}
+        rows = []
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            rows.append((node, depth, node.id in on_path))
+            for child in reversed(node.children):
+                stack.append((child, depth + 1))
+        return rows
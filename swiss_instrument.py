@@ -0,0 +1,147 @@
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Opt-in counters and timers around the engine's hot paths. Off unless an
+# Instruments is attached to TournamentEngine.instruments, which the engine
+# does by itself when one of these is set in the environment:
+#
+#   SWISS_INSTRUMENT=rounds.jsonl   one JSON line per round appended to the file
+#   SWISS_INSTRUMENT=-              a one-line summary per round on stderr
+#   SWISS_PROFILE=profiles/         cProfile of each round as NNNN_round_RRR.prof
+#
+# A round's record covers everything from its pairing until the next round is
+# paired, so the standings refresh after round N's results belongs to round N.
+# Engines created in one process share the environment's Instruments, which
+# is flushed at exit, so simulations get one record per round of every event.
+#
+# Counters:
+#   omw_evaluations    TournamentEngine.get_omw calls
+#   bucket_probes      score buckets searched for an opponent (greedy pairing)
+#   pair_candidates    unpaired players looked at as possible opponents
+#   rematch_hits       of those, ones ruled out because they already met
+#   byes               byes handed out
+# Timers (seconds and calls): pairing, standings, record_results, plus the
+# GUI's ui_pairings, ui_results and ui_standings.
+
+INSTRUMENT_ENV = "SWISS_INSTRUMENT"
+PROFILE_ENV = "SWISS_PROFILE"
+STDERR_STREAM = "-"
+
+class Instruments:
+    def __init__(self, stream=None, profile_dir=None):
+        self.counters = Counter()
+        self.timers = {}
+        self.round = 0
+        self.records = 0
+        self.history = []
+        self.stream = stream
+        self.file = None
+        if stream and stream != STDERR_STREAM:
+            self.file = open(stream, 'a', encoding='utf-8')
+        self.profile_dir = profile_dir
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        self.profiles = []
+        self.lock = threading.Lock()
+        # Timers nest (pairing sorts the standings); only the outermost one on
+        # each thread runs a profiler
+        self.local = threading.local()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    @contextmanager
+    def timer(self, name):
+        depth = getattr(self.local, "depth", 0)
+        profile = None
+        if self.profile_dir and depth == 0:
+            profile = cProfile.Profile()
+            profile.enable()
+        self.local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.local.depth = depth
+            if profile is not None:
+                profile.disable()
+            with self.lock:
+                if profile is not None:
+                    self.profiles.append(profile)
+                totals = self.timers.setdefault(name, [0.0, 0])
+                totals[0] += elapsed
+                totals[1] += 1
+
+    def begin_round(self, round_num):
+        # Called when round_num starts pairing; a retried (cancelled) pairing
+        # stays in the same record
+        if round_num != self.round:
+            self.dump()
+            self.round = round_num
+
+    def dump(self):
+        # Closes the current round's record, writes it out and starts a new one
+        with self.lock:
+            if not self.counters and not self.timers:
+                return None
+            record = {
+                "round": self.round,
+                "counters": dict(self.counters),
+                "timers": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.timers.items()}
+            }
+            profiles = self.profiles
+            self.counters = Counter()
+            self.timers = {}
+            self.profiles = []
+            self.records += 1
+        if self.file:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+        elif self.stream == STDERR_STREAM:
+            print(format_record(record), file=sys.stderr)
+        else:
+            # Kept in memory only when nothing is streamed, for callers that
+            # read them back (long simulations would otherwise grow forever)
+            self.history.append(record)
+        if profiles:
+            try:
+                stats = pstats.Stats(*profiles)
+            except TypeError:
+                # Every profile came back empty
+                stats = None
+            if stats is not None:
+                stats.dump_stats(os.path.join(self.profile_dir, f"{self.records:04d}_round_{record['round']:03d}.prof"))
+        return record
+
+    def close(self):
+        self.dump()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def format_record(record):
+    timers = " ".join(f"{name}={t['seconds'] * 1000:.1f}ms/{t['calls']}" for name, t in sorted(record["timers"].items()))
+    counters = " ".join(f"{name}={value}" for name, value in sorted(record["counters"].items()))
+    return f"[第 {record['round']} 輪] {timers} {counters}"
+
+_shared = None
+
+def from_environment():
+    global _shared
+    stream = os.environ.get(INSTRUMENT_ENV)
+    profile_dir = os.environ.get(PROFILE_ENV)
+    if not stream and not profile_dir:
+        return None
+    if _shared is None:
+        _shared = Instruments(stream, profile_dir)
+        atexit.register(_shared.close)
+    return _shared
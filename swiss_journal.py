@@ -0,0 +1,279 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# Append-only event journal for a TournamentEngine.
+#
+# Every setup, late registration, custom first round, pairing, result batch
+# and reset the engine emits is appended to journal.jsonl as one JSON line
+# with a sequence number. After every `snapshot_every` result batches the full engine state is
+# written to snapshot.json together with the journal offset it covers, so
+# recovery loads the snapshot and replays only the lines after it.
+#
+# Writes go to the OS immediately; fsync of the journal and snapshot writes
+# happen on a background thread every `sync_interval` seconds, so recording
+# results never waits on the disk. A crash loses at most that interval.
+#
+# A reset, or the setup or import of a new event, moves the current files into
+# archive/ first, so an accidental reset_confirm can be undone with
+# recover_archived().
+
+JOURNAL_FILE = "journal.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+ARCHIVE_DIR = "archive"
+# Bytes read at a time when looking back for the last complete line
+TAIL_BLOCK = 65536
+
+def apply_event(engine, event):
+    players = engine.players
+    kind = event["type"]
+    if kind == "setup":
+        engine.pairing_mode = event.get("pairing_mode", engine.pairing_mode)
+        engine.seed_ratings = event.get("seed_ratings", engine.seed_ratings)
+        engine.setup(event["names"], event["rounds"])
+    elif kind == "players":
+        engine.add_players(event["names"])
+    elif kind == "custom":
+        engine.set_custom_pairs([(players[a].name, players[b].name) for a, b in event["pairs"]])
+    elif kind == "round":
+        bye = event["bye"]
+        engine.load_round(event["round"], [(players[a], players[b]) for a, b in event["pairs"]],
+                          players[bye] if bye is not None else None)
+    elif kind == "results":
+        engine.record_results(engine.results_from_codes(event["results"]))
+    elif kind == "revert":
+        engine.revert(event["delta"])
+    elif kind == "restore":
+        engine.restore(event["state"])
+    elif kind == "reset":
+        engine.reset()
+
+def _write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class Journal:
+    def __init__(self, directory, sync_interval=0.2, snapshot_every=1):
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        os.makedirs(directory, exist_ok=True)
+
+        self.engine = None
+        self.results_since_snapshot = 0
+        self.pending_snapshot = None
+        self.dirty = False
+        self.closed = False
+        # lock guards the in-memory state and is all record() waits for;
+        # sync_lock keeps the file from being swapped out (archive) while
+        # fsync or the snapshot write runs outside lock
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.wake = threading.Event()
+        self._open()
+        self.sync_thread = threading.Thread(target=self._sync_loop, daemon=True)
+        self.sync_thread.start()
+
+    def _open(self):
+        # Cuts off a torn final line left by a crash mid-write, so the next
+        # event starts on a line of its own, and picks up the last seq
+        self.seq, end = self._last_seq(self.journal_path)
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > end:
+            os.truncate(self.journal_path, end)
+        self.file = open(self.journal_path, 'ab')
+
+    @staticmethod
+    def _last_seq(path):
+        # (seq of the last complete line, offset just past it). Reads back a
+        # block at a time until a line parses, however long the lines are
+        if not os.path.exists(path):
+            return 0, 0
+        with open(path, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            end = 0
+            while pos > 0:
+                step = min(TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                i = f.read(step).rfind(b"\n")
+                if i >= 0:
+                    end = pos + i + 1
+                    break
+            # Blocks back to the start of the earliest line not tried yet;
+            # they are only joined once a line boundary turns up
+            pos = end
+            blocks = []
+            while pos > 0:
+                step = min(TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step)
+                blocks.insert(0, block)
+                if pos > 0 and b"\n" not in block:
+                    continue
+                lines = b"".join(blocks).split(b"\n")
+                for line in reversed(lines[0 if pos == 0 else 1:-1]):
+                    try:
+                        return json.loads(line)["seq"], end
+                    except (ValueError, KeyError):
+                        continue
+                blocks = [lines[0] + b"\n"]
+        return 0, end
+
+    def has_state(self):
+        return self.seq > 0
+
+    def attach(self, engine):
+        self.engine = engine
+        if self.record not in engine.listeners:
+            engine.listeners.append(self.record)
+
+    def detach(self):
+        if self.engine and self.record in self.engine.listeners:
+            self.engine.listeners.remove(self.record)
+        self.engine = None
+
+    def record(self, event):
+        if event["type"] in ("reset", "setup", "restore") and self.has_state():
+            self.archive()
+        if event["type"] == "reset":
+            return
+        with self.lock:
+            self.seq += 1
+            line = json.dumps({"seq": self.seq, **event}, ensure_ascii=False, separators=(",", ":")) + "\n"
+            self.file.write(line.encode('utf-8'))
+            self.file.flush()
+            self.dirty = True
+            if event["type"] == "results":
+                self.results_since_snapshot += 1
+                if self.engine and self.results_since_snapshot >= self.snapshot_every:
+                    self.results_since_snapshot = 0
+                    self.pending_snapshot = {"seq": self.seq, "offset": self.file.tell(), "state": self.engine.snapshot()}
+        self.wake.set()
+
+    def sync(self):
+        with self.sync_lock:
+            self._sync()
+
+    def _sync(self):
+        # Caller holds sync_lock. Takes the pending work under lock and does
+        # the disk writes after releasing it, so record() never waits on them
+        with self.lock:
+            dirty = self.dirty
+            self.dirty = False
+            snapshot = self.pending_snapshot
+            self.pending_snapshot = None
+            fileno = self.file.fileno()
+        if dirty:
+            os.fsync(fileno)
+        if snapshot is not None:
+            # The journal lines it covers are on disk now
+            _write_json_atomic(self.snapshot_path, snapshot)
+
+    def _sync_loop(self):
+        while not self.closed:
+            self.wake.wait(self.sync_interval)
+            self.wake.clear()
+            if not self.closed:
+                self.sync()
+
+    def archive(self):
+        with self.sync_lock:
+            self._sync()
+            self._archive()
+
+    def _archive(self):
+        with self.lock:
+            self.file.close()
+            archive_dir = os.path.join(self.directory, ARCHIVE_DIR)
+            os.makedirs(archive_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            os.replace(self.journal_path, os.path.join(archive_dir, f"{stamp}.{JOURNAL_FILE}"))
+            if os.path.exists(self.snapshot_path):
+                os.replace(self.snapshot_path, os.path.join(archive_dir, f"{stamp}.{SNAPSHOT_FILE}"))
+            self.file = open(self.journal_path, 'ab')
+            self.seq = 0
+            self.results_since_snapshot = 0
+
+    def latest_archive(self):
+        archive_dir = os.path.join(self.directory, ARCHIVE_DIR)
+        if not os.path.isdir(archive_dir):
+            return None
+        stamps = sorted(name[:-len(JOURNAL_FILE) - 1] for name in os.listdir(archive_dir) if name.endswith(JOURNAL_FILE))
+        if not stamps:
+            return None
+        return os.path.join(archive_dir, f"{stamps[-1]}.{JOURNAL_FILE}"), os.path.join(archive_dir, f"{stamps[-1]}.{SNAPSHOT_FILE}")
+
+    def recover(self, engine):
+        # Rebuilds engine from the current journal; returns False if empty
+        self.sync()
+        return self._recover_from(engine, self.journal_path, self.snapshot_path)
+
+    def recover_archived(self, engine):
+        # Restores the most recently archived event (e.g. after a reset) and
+        # makes it the live journal again
+        latest = self.latest_archive()
+        if latest is None:
+            return False
+        journal_path, snapshot_path = latest
+        with self.sync_lock:
+            if self.has_state():
+                self._sync()
+                self._archive()
+            with self.lock:
+                self.file.close()
+                os.replace(journal_path, self.journal_path)
+                if os.path.exists(snapshot_path):
+                    os.replace(snapshot_path, self.snapshot_path)
+                elif os.path.exists(self.snapshot_path):
+                    os.remove(self.snapshot_path)
+                self._open()
+        return self._recover_from(engine, self.journal_path, self.snapshot_path)
+
+    def _recover_from(self, engine, journal_path, snapshot_path):
+        attached = self.record in engine.listeners
+        if attached:
+            engine.listeners.remove(self.record)
+        try:
+            seq = 0
+            offset = 0
+            if os.path.exists(snapshot_path):
+                with open(snapshot_path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                engine.restore(snapshot["state"])
+                seq = snapshot["seq"]
+                offset = snapshot["offset"]
+            else:
+                engine.clear()
+            if not os.path.exists(journal_path):
+                return seq > 0
+            with open(journal_path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-write
+                        break
+                    if event["seq"] > seq:
+                        apply_event(engine, event)
+                        seq = event["seq"]
+            return seq > 0
+        finally:
+            if attached:
+                engine.listeners.append(self.record)
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.sync_thread.join()
+        self.sync()
+        self.detach()
+        self.file.close()
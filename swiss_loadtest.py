@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from swiss_engine import DOUBLE_LOSS
+from swiss_server import DEFAULT_HOST
+
+# Load test for swiss_server.py: runs many complete events at once, each on
+# its own keep-alive connection (create -> pair -> results -> standings per
+# round -> export), and reports sustained requests per second and latency
+# percentiles per endpoint.
+#
+#   python swiss_loadtest.py --events 300 --players 64 --rounds 6
+#   python swiss_loadtest.py --port 8765 ...      against an already running server
+#
+# Without --port a server is started on a free port for the duration of the
+# run, so client and server do not share a Python process.
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, method, path, data=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8') if data is not None else b""
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: swiss\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        payload = await self.reader.readexactly(length)
+        return status, payload
+
+    def close(self):
+        self.writer.close()
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.events_finished = 0
+
+    def summary(self, elapsed):
+        total = sum(len(values) for values in self.latencies.values())
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[name] = {
+                "requests": len(values),
+                "p50_ms": values[len(values) // 2] * 1000,
+                "p95_ms": values[int(len(values) * 0.95)] * 1000,
+                "p99_ms": values[int(len(values) * 0.99)] * 1000
+            }
+        return {
+            "requests": total,
+            "seconds": elapsed,
+            "requests_per_second": total / elapsed if elapsed else 0.0,
+            "events_finished": self.events_finished,
+            "errors": dict(self.errors),
+            "endpoints": endpoints
+        }
+
+async def run_event(index, host, port, n_players, rounds, rng, stats, start_gate):
+    await start_gate.wait()
+    client = await Client.connect(host, port)
+
+    async def call(name, method, path, data=None):
+        start = time.perf_counter()
+        status, payload = await client.request(method, path, data)
+        stats.latencies[name].append(time.perf_counter() - start)
+        if status >= 400:
+            stats.errors[f"{name} {status}"] += 1
+            raise RuntimeError(payload.decode('utf-8', 'replace'))
+        return payload
+
+    try:
+        event_id = f"load-{index:05d}"
+        await call("create", "POST", "/tournaments",
+                   {"id": event_id, "players": [f"P{i:05d}" for i in range(n_players)], "rounds": rounds, "seed": index})
+        base = f"/tournaments/{event_id}"
+        for _ in range(rounds):
+            paired = json.loads(await call("pair", "POST", f"{base}/pair", {}))
+            results = [DOUBLE_LOSS if rng.random() < 0.02 else rng.choice((p1, p2)) for _, p1, p2 in paired["pairs"]]
+            await call("results", "POST", f"{base}/results", {"results": results})
+            await call("standings", "GET", f"{base}/standings")
+        await call("export", "GET", f"{base}/export")
+        await call("delete", "DELETE", base)
+        stats.events_finished += 1
+    except RuntimeError:
+        pass
+    finally:
+        client.close()
+
+async def run_load(host, port, events, n_players, rounds, seed=0):
+    stats = LoadStats()
+    rng = random.Random(seed)
+    start_gate = asyncio.Event()
+    tasks = [asyncio.create_task(run_event(i, host, port, n_players, rounds, random.Random(rng.getrandbits(64)), stats, start_gate))
+             for i in range(events)]
+    start = time.perf_counter()
+    start_gate.set()
+    await asyncio.gather(*tasks)
+    return stats.summary(time.perf_counter() - start)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((DEFAULT_HOST, 0))
+        return s.getsockname()[1]
+
+def start_server(port, workers):
+    args = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "swiss_server.py"), "--port", str(port)]
+    if workers is not None:
+        args += ["--workers", str(workers)]
+    server = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    # The server prints one line once it is listening
+    server.stdout.readline()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="瑞士輪服務壓力測試")
+    parser.add_argument("--events", type=int, default=200, help="同時進行的賽事數量")
+    parser.add_argument("--players", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, help="連線至已啟動的服務；省略時自動啟動一個")
+    parser.add_argument("--workers", type=int, default=None, help="自動啟動服務時的配對行程數")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        port = free_port()
+        server = start_server(port, args.workers)
+    try:
+        summary = asyncio.run(run_load(args.host, port, args.events, args.players, args.rounds, args.seed))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.events} 場賽事（{args.players} 人，{args.rounds} 輪）完成 {summary['events_finished']} 場，"
+          f"{summary['requests']} 個請求，耗時 {summary['seconds']:.1f} 秒，{summary['requests_per_second']:.0f} 請求/秒")
+    print(f"{'端點':<10} | {'請求數':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    for name, data in summary["endpoints"].items():
+        print(f"{name:<10} | {data['requests']:>8} | {data['p50_ms']:>8.1f} | {data['p95_ms']:>8.1f} | {data['p99_ms']:>8.1f}")
+    if summary["errors"]:
+        print("錯誤:", ", ".join(f"{name} ×{count}" for name, count in summary["errors"].items()))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import bisect
+import time
+
+from swiss_matching import MatchingCancelled, MatchingTimeout, max_weight_matching
+
+class PairingCancelled(Exception):
+    pass
+
+class PlayedPairs:
+    # Who has already played whom, keyed by dense integer player id, with a
+    # hash set per player so rematch checks are O(1) however long the event.
+    def __init__(self):
+        self.opponents = []
+
+    def _grow(self, player_id):
+        while len(self.opponents) <= player_id:
+            self.opponents.append(set())
+
+    def add(self, a, b):
+        self._grow(max(a, b))
+        self.opponents[a].add(b)
+        self.opponents[b].add(a)
+
+    def remove(self, a, b):
+        self.opponents[a].discard(b)
+        self.opponents[b].discard(a)
+
+    def played(self, a, b):
+        return a < len(self.opponents) and b in self.opponents[a]
+
+    def opponents_of(self, a):
+        if a < len(self.opponents):
+            return self.opponents[a]
+        return set()
+
+    @classmethod
+    def from_players(cls, players):
+        played = cls()
+        for p in players:
+            played._grow(p.id)
+            for opp in p.opponents:
+                played.add(p.id, opp.id)
+        return played
+
+class ScoreBucket:
+    # Players on the same points, in standings order (OMW high to low). Taken
+    # players are skipped through "next free" and "previous free" links that
+    # are path-compressed on lookup (a union-find over bucket positions), so
+    # reaching the first or nearest free player is near O(1) amortised
+    # however big the bucket is. Rematches are checked against the
+    # PlayedPairs set, and only a player's own past opponents are ever
+    # stepped over.
+    def __init__(self, points, players, get_omw, stats=None):
+        self.points = points
+        self.players = players
+        self.keys = [-get_omw(p) for p in players]
+        self.positions = {p.id: i for i, p in enumerate(players)}
+        n = len(players)
+        self.free = [True] * n
+        self.n_free = n
+        # next_free[i] leads to the first free position >= i (n: none);
+        # prev_free[i + 1] to the last free position <= i, shifted by one so
+        # that 0 means none
+        self.next_free = list(range(n + 1))
+        self.prev_free = list(range(n + 1))
+        # swiss_instrument counters, or None
+        self.stats = stats
+
+    @staticmethod
+    def _find(links, i):
+        root = i
+        while links[root] != root:
+            root = links[root]
+        while links[i] != root:
+            links[i], i = root, links[i]
+        return root
+
+    def take(self, pos):
+        self.free[pos] = False
+        self.n_free -= 1
+        self.next_free[pos] = pos + 1
+        self.prev_free[pos + 1] = pos
+
+    def next_legal(self, pos, opponent_ids):
+        # First free position >= pos not in opponent_ids, or len(players)
+        players = self.players
+        n = len(players)
+        pos = self._find(self.next_free, pos)
+        while pos < n and players[pos].id in opponent_ids:
+            pos = self._find(self.next_free, pos + 1)
+        return pos
+
+    def prev_legal(self, pos, opponent_ids):
+        # Last free position <= pos not in opponent_ids, or -1
+        players = self.players
+        pos = self._find(self.prev_free, pos + 1) - 1
+        while pos >= 0 and players[pos].id in opponent_ids:
+            pos = self._find(self.prev_free, pos) - 1
+        return pos
+
+    def probe(self, opponent_ids):
+        stats = self.stats
+        stats["bucket_probes"] += 1
+        stats["pair_candidates"] += self.n_free
+        positions = self.positions
+        free = self.free
+        for opp_id in opponent_ids:
+            pos = positions.get(opp_id)
+            if pos is not None and free[pos]:
+                stats["rematch_hits"] += 1
+
+    def first_available(self, opponent_ids):
+        if self.stats is not None:
+            self.probe(opponent_ids)
+        pos = self.next_legal(0, opponent_ids)
+        return pos if pos < len(self.players) else None
+
+    def closest(self, omw, opponent_ids):
+        # Nearest OMW to a player floating down from a higher bucket. On equal
+        # distance the earlier player in standings order wins, as in the old scan.
+        if self.stats is not None:
+            self.probe(opponent_ids)
+        keys = self.keys
+        idx = bisect.bisect_left(keys, -omw)
+
+        right = self.next_legal(idx, opponent_ids)
+        if right == len(keys):
+            right = None
+        left = self.prev_legal(idx - 1, opponent_ids)
+        if left < 0:
+            left = None
+        else:
+            # The earliest legal player with the same OMW
+            left = self.next_legal(bisect.bisect_left(keys, keys[left]), opponent_ids)
+
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if abs(omw + keys[left]) <= abs(omw + keys[right]):
+            return left
+        return right
+
+def build_buckets(players, get_omw, stats=None):
+    groups = {}
+    for p in players:
+        groups.setdefault(p.points, []).append(p)
+    return [ScoreBucket(points, groups[points], get_omw, stats) for points in sorted(groups, reverse=True)]
+
+def pair_score_groups(players, get_omw, played, should_stop=None, progress=None, stats=None):
+    # players must be in standings order (points, then OMW, descending) and
+    # played is the PlayedPairs index. Each player takes the first legal
+    # opponent in its own bucket and otherwise floats to the nearest-OMW legal
+    # opponent in the next bucket down, which is the same "point difference,
+    # then OMW difference" rule as the old greedy scan. Returns
+    # (pairs, bye_player). should_stop/progress are polled once per bucket;
+    # stats is an optional swiss_instrument counter dict.
+    buckets = build_buckets(players, get_omw, stats)
+    paired = []
+    remaining = len(players)
+    for bi, bucket in enumerate(buckets):
+        if should_stop is not None and should_stop():
+            raise PairingCancelled()
+        if progress is not None:
+            progress(1.0 - remaining / max(1, len(players)))
+        for pos, p1 in enumerate(bucket.players):
+            if not bucket.free[pos]:
+                continue
+            if remaining == 1:
+                return paired, p1
+            bucket.take(pos)
+            remaining -= 1
+            opponent_ids = played.opponents_of(p1.id)
+            target = bucket
+            found = bucket.first_available(opponent_ids)
+            if found is None:
+                omw = get_omw(p1)
+                for target in buckets[bi + 1:]:
+                    found = target.closest(omw, opponent_ids)
+                    if found is not None:
+                        break
+            # A player with no legal opponent left is skipped for the round
+            if found is not None:
+                target.take(found)
+                remaining -= 1
+                paired.append((p1, target.players[found]))
+    return paired, None
+
+PAIRING_GREEDY = "greedy"
+PAIRING_MATCHING = "matching"
+
+# Max-weight matching is solved over consecutive chunks of the standings
+# (players left unmatched in one chunk float into the next), so a round costs
+# O(n * MATCHING_CHUNK_SIZE^2) rather than O(n^3). Pure Python handles a chunk
+# of 64 in a few tens of milliseconds, i.e. a 4000-player round in about 1.5
+# seconds. If the whole round is not done within MATCHING_TIME_BUDGET seconds,
+# pair_max_weight raises PairingTimeout and the engine falls back to
+# pair_score_groups.
+MATCHING_CHUNK_SIZE = 64
+MATCHING_TIME_BUDGET = 5.0
+OMW_SCALE = 1000
+
+class PairingTimeout(Exception):
+    pass
+
+def _pair_cost(point_diff, omw_diff, point_weight):
+    # Squared point difference so two one-bracket floats beat one two-bracket
+    # float; point_weight keeps any point difference above every OMW term.
+    return point_diff * point_diff * point_weight + round(omw_diff * OMW_SCALE)
+
+def _match_chunk(chunk, get_omw, played, with_bye, bye_eligible, deadline, should_stop, stats):
+    n = len(chunk)
+    point_weight = (OMW_SCALE + 1) * (n + 1)
+    omws = [get_omw(p) for p in chunk]
+    candidates = []
+    for i in range(n):
+        p1 = chunk[i]
+        opponent_ids = played.opponents_of(p1.id)
+        for j in range(i + 1, n):
+            p2 = chunk[j]
+            if p2.id not in opponent_ids:
+                cost = _pair_cost(abs(p1.points - p2.points), abs(omws[i] - omws[j]), point_weight)
+                candidates.append((i, j, cost))
+    if stats is not None:
+        stats["pair_candidates"] += n * (n - 1) // 2
+        stats["rematch_hits"] += n * (n - 1) // 2 - len(candidates)
+    bye_vertex = n
+    if with_bye:
+        # The bye is an opponent on 0 points and 0 OMW, so it goes to the
+        # lowest-placed player who has not had one yet. Everyone gets an edge
+        # to it, so a player who already had a bye takes another rather than
+        # sitting out.
+        for i in range(n):
+            candidates.append((i, bye_vertex, _pair_cost(chunk[i].points, omws[i], point_weight)))
+    if not candidates:
+        return [], None, list(chunk)
+
+    # Weights in tiers, each above every cost term of a whole matching put
+    # together: a real pair beats any bye edge, so the bye never stands in
+    # for a pair, and an eligible bye beats a repeat one
+    max_cost = max(cost for _, _, cost in candidates)
+    tier = 2 * (max_cost + 1) * (n + 1)
+    edges = []
+    for i, j, cost in candidates:
+        weight = 2 * (max_cost + 1 - cost)
+        if j != bye_vertex:
+            weight += 2 * tier
+        elif bye_eligible is None or chunk[i].id in bye_eligible:
+            weight += tier
+        edges.append((i, j, weight))
+    try:
+        mate = max_weight_matching(edges, maxcardinality=True, deadline=deadline, should_stop=should_stop)
+    except MatchingTimeout:
+        raise PairingTimeout()
+    except MatchingCancelled:
+        raise PairingCancelled()
+    mate = mate + [-1] * (n + 1 - len(mate))
+
+    paired = []
+    bye_player = None
+    unmatched = []
+    for i in range(n):
+        j = mate[i]
+        if j == bye_vertex:
+            bye_player = chunk[i]
+        elif j == -1:
+            unmatched.append(chunk[i])
+        elif i < j:
+            paired.append((chunk[i], chunk[j]))
+    return paired, bye_player, unmatched
+
+def pair_max_weight(players, get_omw, played, bye_eligible=None, chunk_size=MATCHING_CHUNK_SIZE, time_budget=MATCHING_TIME_BUDGET,
+                    should_stop=None, progress=None, stats=None):
+    # players in standings order. Maximises the number of legal (no-rematch)
+    # pairs first and then minimises the total point/OMW gap, so nobody is
+    # dropped just because the greedy scan boxed them in. bye_eligible is a set
+    # of player ids that take the bye of an odd field before anyone else; a
+    # repeat bye only goes out when no eligible player can have it. Returns
+    # (pairs, bye_player).
+    deadline = time.perf_counter() + time_budget
+    paired = []
+    bye_player = None
+    carry = []
+    for start in range(0, len(players), chunk_size):
+        if progress is not None:
+            progress(start / len(players))
+        chunk = carry + players[start:start + chunk_size]
+        last = start + chunk_size >= len(players)
+        chunk_pairs, chunk_bye, carry = _match_chunk(chunk, get_omw, played, last and len(chunk) % 2 == 1, bye_eligible, deadline, should_stop, stats)
+        paired.extend(chunk_pairs)
+        if chunk_bye is not None:
+            if bye_player is not None:
+                raise ValueError(f"配對出現兩個輪空: {bye_player.name}、{chunk_bye.name}")
+            bye_player = chunk_bye
+
+    if carry and bye_player is None:
+        # The last chunk's matching has the most pairs it can, so nobody left
+        # has a legal opponent; as in pair_score_groups, all but the last of
+        # them sit the round out and the last takes the bye. With the bye
+        # already given they all sit out.
+        rest_pairs, bye_player = pair_score_groups(carry, get_omw, played, should_stop, stats=stats)
+        paired.extend(rest_pairs)
+    return paired, bye_player
@@ -0,0 +1,269 @@
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+from swiss_archive import Archive
+from swiss_csv import iter_csv_rounds
+from swiss_engine import BYE, DOUBLE_LOSS, RESULT_P1_WIN, RESULT_P2_WIN
+
+# Glicko-style player ratings estimated from match histories: the engine's
+# match_history, CSV exports of past events (see swiss_csv) or columnar
+# archives of many events (see swiss_archive).
+#
+# Every round is one rating period. All matches of a round are rated at once
+# with array operations, so a player's rating only moves between rounds and
+# the order of tables does not matter. Before each new event the deviation
+# of everyone grows by DEVIATION_GROWTH, so players who have been away count
+# as less certain. Byes and 雙敗 say nothing about who is stronger and are
+# skipped.
+#
+#   python swiss_rating.py events/*.csv --save ratings.json --top 20
+#   python swiss_rating.py season.swa --save ratings.json
+
+DEFAULT_RATING = 1500.0
+DEFAULT_DEVIATION = 350.0
+MIN_DEVIATION = 30.0
+DEVIATION_GROWTH = 50.0
+RATING_SCALE = 400.0
+Q = math.log(10) / RATING_SCALE
+
+def deviation_factor(deviation):
+    # Glicko's g(RD): how much an uncertain rating flattens the expectation
+    return 1.0 / np.sqrt(1.0 + 3.0 * Q * Q * np.square(deviation) / (math.pi * math.pi))
+
+def win_probability(rating, opp_rating, deviation=0.0, opp_deviation=0.0):
+    # Expected score of rating against opp_rating; scalars for one match
+    factor = 1.0 / math.sqrt(1.0 + 3.0 * Q * Q * (deviation * deviation + opp_deviation * opp_deviation) / (math.pi * math.pi))
+    return 1.0 / (1.0 + math.pow(10.0, -factor * (rating - opp_rating) / RATING_SCALE))
+
+class RatingTable:
+    # Ratings by player name; arrays grow as new names come in
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.ratings = np.zeros(0, dtype=np.float64)
+        self.deviations = np.zeros(0, dtype=np.float64)
+        self.games = np.zeros(0, dtype=np.int32)
+        self.events = 0
+        self.matches = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def ids(self, names):
+        # Ids for names, adding unknown players at the default rating
+        index = self.index
+        ids = []
+        for name in names:
+            player_id = index.get(name)
+            if player_id is None:
+                player_id = index[name] = len(self.names)
+                self.names.append(name)
+            ids.append(player_id)
+        self._grow()
+        return np.array(ids, dtype=np.int32)
+
+    def _grow(self):
+        n = len(self.names)
+        if n > len(self.ratings):
+            extra = n - len(self.ratings)
+            self.ratings = np.append(self.ratings, np.full(extra, DEFAULT_RATING))
+            self.deviations = np.append(self.deviations, np.full(extra, DEFAULT_DEVIATION))
+            self.games = np.append(self.games, np.zeros(extra, dtype=np.int32))
+
+    def get(self, name):
+        # (rating, deviation) of name, defaults for unknown players
+        player_id = self.index.get(name)
+        if player_id is None:
+            return DEFAULT_RATING, DEFAULT_DEVIATION
+        return float(self.ratings[player_id]), float(self.deviations[player_id])
+
+    def new_event(self):
+        np.minimum(np.sqrt(np.square(self.deviations) + DEVIATION_GROWTH * DEVIATION_GROWTH), DEFAULT_DEVIATION,
+                   out=self.deviations)
+        self.events += 1
+
+    def rate_round(self, p1, p2, scores):
+        # p1, p2: id arrays; scores: p1's score per match (1 win, 0 loss,
+        # 0.5 draw). One Glicko rating period.
+        p1 = np.asarray(p1, dtype=np.int32)
+        p2 = np.asarray(p2, dtype=np.int32)
+        scores = np.asarray(scores, dtype=np.float64)
+        if len(p1) == 0:
+            return
+        n = len(self.ratings)
+        ratings = self.ratings
+        deviations = self.deviations
+        g1 = deviation_factor(deviations[p1])
+        g2 = deviation_factor(deviations[p2])
+        diff = ratings[p1] - ratings[p2]
+        expected1 = 1.0 / (1.0 + np.power(10.0, -g2 * diff / RATING_SCALE))
+        expected2 = 1.0 / (1.0 + np.power(10.0, g1 * diff / RATING_SCALE))
+        ids = np.concatenate([p1, p2])
+        info = np.bincount(ids, np.concatenate([g2 * g2 * expected1 * (1.0 - expected1), g1 * g1 * expected2 * (1.0 - expected2)]),
+                           minlength=n) * (Q * Q)
+        surprise = np.bincount(ids, np.concatenate([g2 * (scores - expected1), g1 * ((1.0 - scores) - expected2)]), minlength=n)
+        played = np.bincount(ids, minlength=n)
+        rated = played > 0
+        variance = 1.0 / (1.0 / np.square(deviations[rated]) + info[rated])
+        ratings[rated] += Q * variance * surprise[rated]
+        deviations[rated] = np.maximum(np.sqrt(variance), MIN_DEVIATION)
+        self.games += played.astype(np.int32)
+        self.matches += len(p1)
+
+    def rate_rows(self, rows):
+        # rows: (player1, player2, result) of one round, as in match_history
+        # or a CSV export; byes and double losses are skipped
+        names1 = []
+        names2 = []
+        scores = []
+        for name1, name2, result in rows:
+            if name2 == BYE or result == DOUBLE_LOSS:
+                continue
+            names1.append(name1)
+            names2.append(name2)
+            scores.append(1.0 if result == name1 else 0.0 if result == name2 else 0.5)
+        self.rate_round(self.ids(names1), self.ids(names2), scores)
+
+    def rate_history(self, match_history):
+        # A whole event from TournamentEngine.match_history, round by round
+        self.new_event()
+        round_rows = []
+        current = None
+        for round_num, name1, name2, result in match_history:
+            if round_num != current:
+                if round_rows:
+                    self.rate_rows(round_rows)
+                current = round_num
+                round_rows = []
+            round_rows.append((name1, name2, result))
+        if round_rows:
+            self.rate_rows(round_rows)
+
+    def rate_engine(self, engine):
+        self.rate_history(engine.match_history)
+
+    def rate_csv(self, filename):
+        self.new_event()
+        with open(filename, newline='', encoding='utf-8') as f:
+            for round_num, rows in iter_csv_rounds(f):
+                if round_num not in ("standings", "roster"):
+                    self.rate_rows(rows)
+
+    def rate_archive(self, archive):
+        # Every event of a swiss_archive.Archive, straight from its columns
+        table_ids = self.ids(archive.names)
+        for event in range(len(archive)):
+            self.new_event()
+            matches = archive.event_matches(event)
+            results = matches["result"]
+            rated = (results == RESULT_P1_WIN) | (results == RESULT_P2_WIN)
+            rounds = matches["round"][rated]
+            p1 = table_ids[matches["player1"][rated]]
+            p2 = table_ids[matches["player2"][rated]]
+            scores = (results[rated] == RESULT_P1_WIN).astype(np.float64)
+            # Rows are in play order, so each round is one run
+            bounds = [0, *(np.flatnonzero(np.diff(rounds)) + 1).tolist(), len(rounds)]
+            for start, end in zip(bounds, bounds[1:]):
+                self.rate_round(p1[start:end], p2[start:end], scores[start:end])
+
+    def copy(self):
+        table = RatingTable()
+        table.names = list(self.names)
+        table.index = dict(self.index)
+        table.ratings = self.ratings.copy()
+        table.deviations = self.deviations.copy()
+        table.games = self.games.copy()
+        table.events = self.events
+        table.matches = self.matches
+        return table
+
+    def for_players(self, players):
+        # (ratings, deviations) lists indexed like players, e.g. engine.players
+        ratings = []
+        deviations = []
+        for player in players:
+            rating, deviation = self.get(player.name)
+            ratings.append(rating)
+            deviations.append(deviation)
+        return ratings, deviations
+
+    def seed_ratings(self):
+        # {name: rating} for TournamentEngine.seed_ratings
+        return {name: float(rating) for name, rating in zip(self.names, self.ratings)}
+
+    def top(self, n):
+        order = np.lexsort((-self.deviations, -self.ratings))[:n]
+        return [(self.names[i], float(self.ratings[i]), float(self.deviations[i]), int(self.games[i])) for i in order]
+
+    def to_dict(self):
+        return {
+            "events": self.events,
+            "matches": self.matches,
+            "players": {name: [float(self.ratings[i]), float(self.deviations[i]), int(self.games[i])] for name, i in self.index.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        table = cls()
+        players = data.get("players", {})
+        table.ids(players)
+        for name, (rating, deviation, games) in players.items():
+            i = table.index[name]
+            table.ratings[i] = rating
+            table.deviations[i] = deviation
+            table.games[i] = games
+        table.events = data.get("events", 0)
+        table.matches = data.get("matches", 0)
+        return table
+
+    @classmethod
+    def from_ratings(cls, ratings):
+        # {name: rating} or {name: [rating, deviation]}, e.g. from a request;
+        # a bare rating is taken as uncertain as a newcomer's
+        table = cls()
+        table.ids(ratings)
+        for name, value in ratings.items():
+            i = table.index[name]
+            if isinstance(value, (list, tuple)):
+                table.ratings[i] = float(value[0])
+                table.deviations[i] = float(value[1])
+            else:
+                table.ratings[i] = float(value)
+        return table
+
+    def save(self, filename):
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+def main():
+    parser = argparse.ArgumentParser(description="由歷史賽事計算玩家評分")
+    parser.add_argument("files", nargs="+", help="匯出的 CSV 檔或賽事封存，依舉辦順序")
+    parser.add_argument("--load", help="先載入既有評分 JSON")
+    parser.add_argument("--save", help="將評分寫入 JSON 檔")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    table = RatingTable.load(args.load) if args.load else RatingTable()
+    for filename in args.files:
+        if os.path.isdir(filename):
+            table.rate_archive(Archive(filename))
+        else:
+            table.rate_csv(filename)
+    print(f"{table.events} 場賽事，{table.matches} 場比賽，{len(table)} 名玩家")
+    print(f"{'玩家':<16} | {'評分':>8} | {'偏差':>6} | {'場數':>6}")
+    for name, rating, deviation, games in table.top(args.top):
+        print(f"{name:<16} | {rating:>8.1f} | {deviation:>6.1f} | {games:>6}")
+    if args.save:
+        table.save(args.save)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from swiss_csv import CsvRoundWriter, write_csv
+from swiss_engine import TournamentEngine
+from swiss_journal import Journal
+from swiss_pairing import PAIRING_GREEDY, PAIRING_MATCHING
+
+# Local HTTP/JSON service hosting many tournaments in one process, on the same
+# TournamentEngine the GUI uses. Standard library only, apart from numpy for
+# ratings and forecasts (imported when first used):
+#
+#   python swiss_server.py --port 8765 --journal-dir swiss_events
+#
+#   GET    /tournaments                      list of events
+#   POST   /tournaments                      {"players": [...], "rounds": 5, "id"?, "seed"?, "pairing"?,
+#                                             "ratings"?: {name: rating or [rating, deviation]}}
+#   POST   /tournaments/<id>/players         {"names": [...]} more players before round 1
+#   POST   /tournaments/<id>/pair            {"pairing"?} pairs the next round
+#   POST   /tournaments/<id>/results         {"results": [winner or 雙敗, ...]} or {"lines": "1, 王小明\n..."}
+#   GET    /tournaments/<id>/standings
+#   GET    /tournaments/<id>/export          the same CSV as 匯出CSV
+#
+# With --journal-dir every event also keeps <dir>/<id>/export.csv up to date
+# as results come in (swiss_csv.CsvRoundWriter); /export then copies the
+# match rows from it and only formats the standings.
+#   POST   /tournaments/<id>/forecast        {"simulations"?, "top_cut"?} plays out the remaining rounds
+#   POST   /tournaments/<id>/undo | /redo    step through the version history
+#   GET    /tournaments/<id>/versions        every version, including side branches
+#   POST   /tournaments/<id>/checkout        {"version": n} switch to another branch
+#   DELETE /tournaments/<id>                 the journal moves to <dir>/<id>/archive/
+#
+# Ratings seed round 1 by strength and are the starting point of forecasts,
+# which also rate the rounds played so far (swiss_rating, swiss_simulate).
+#
+# Requests for one tournament are serialised by its asyncio.Lock; different
+# tournaments never wait on each other. Pairing fields of pool_min_players or
+# more is done in a process pool from a snapshot, and big standings/exports
+# run on a thread, so the event loop keeps serving everyone else. Engine
+# ValueErrors come back as 400 with {"error": message}.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Below this a round pairs faster inline than the snapshot round trip
+POOL_MIN_PLAYERS = 256
+MAX_FORECAST_SIMULATIONS = 10000
+MAX_BODY = 16 * 1024 * 1024
+TOURNAMENT_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+EXPORT_FILE = "export.csv"
+# The create request's ratings, for forecasts after a restart; the journal
+# itself keeps the pairing mode and seed ratings
+RATINGS_FILE = "ratings.json"
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _int_field(data, key, default):
+    # Request fields like {"rounds": null} come back as a 400, not a TypeError
+    try:
+        return int(data.get(key, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} 必須是整數！")
+
+def _pair_in_worker(state, round_num, mode, seed, time_budget, seed_ratings):
+    # Runs in a pool process; only plain data crosses the boundary
+    engine = TournamentEngine(seed=seed)
+    engine.restore(state)
+    engine.matching_time_budget = time_budget
+    engine.seed_ratings = seed_ratings
+    paired, bye_player, fell_back = engine.compute_pairings(round_num, mode)
+    return [[p1.id, p2.id] for p1, p2 in paired], bye_player.id if bye_player else None, fell_back
+
+def _forecast_in_worker(state, pairing_mode, model, simulations, top_cut, seed):
+    from swiss_simulate import forecast
+    engine = TournamentEngine(pairing_mode=pairing_mode)
+    engine.restore(state)
+    return forecast(engine, model, simulations, top_cut, workers=1, seed=seed)
+
+class Tournament:
+    def __init__(self, tournament_id, engine, journal=None, ratings=None):
+        self.id = tournament_id
+        self.engine = engine
+        self.journal = journal
+        self.csv_writer = CsvRoundWriter(engine, os.path.join(journal.directory, EXPORT_FILE)) if journal else None
+        # swiss_rating.RatingTable from the create request, or None
+        self.ratings = ratings
+        self.lock = asyncio.Lock()
+
+    def summary(self):
+        engine = self.engine
+        return {
+            "id": self.id,
+            "players": len(engine.players),
+            "rounds": engine.rounds,
+            "current_round": engine.current_round,
+            "results_confirmed": engine.results_confirmed,
+            "finished": engine.is_finished() and engine.results_confirmed
+        }
+
+    def close(self):
+        if self.csv_writer:
+            self.csv_writer.close()
+        if self.journal:
+            self.journal.close()
+
+    def discard(self):
+        # For a deleted event: the journal moves to archive/ (recover_archived
+        # can still bring it back), so a restart does not reopen it
+        if self.journal:
+            self.journal.archive()
+            ratings_path = os.path.join(self.journal.directory, RATINGS_FILE)
+            if os.path.exists(ratings_path):
+                os.remove(ratings_path)
+        self.close()
+
+class TournamentService:
+    def __init__(self, workers=None, journal_dir=None, pool_min_players=POOL_MIN_PLAYERS):
+        self.tournaments = {}
+        self.journal_dir = journal_dir
+        self.pool_min_players = pool_min_players
+        self.pool = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+
+    def recover(self):
+        # Reopens every journaled event under journal_dir
+        if not self.journal_dir or not os.path.isdir(self.journal_dir):
+            return 0
+        for tournament_id in sorted(os.listdir(self.journal_dir)):
+            if not TOURNAMENT_ID.match(tournament_id):
+                continue
+            journal = Journal(os.path.join(self.journal_dir, tournament_id))
+            if not journal.has_state():
+                journal.close()
+                continue
+            engine = TournamentEngine()
+            journal.recover(engine)
+            journal.attach(engine)
+            ratings = None
+            ratings_path = os.path.join(journal.directory, RATINGS_FILE)
+            if os.path.exists(ratings_path):
+                from swiss_rating import RatingTable
+                ratings = RatingTable.load(ratings_path)
+            self.tournaments[tournament_id] = Tournament(tournament_id, engine, journal, ratings)
+        return len(self.tournaments)
+
+    def close(self):
+        for tournament in self.tournaments.values():
+            tournament.close()
+        if self.pool:
+            self.pool.shutdown()
+
+    def get(self, tournament_id):
+        tournament = self.tournaments.get(tournament_id)
+        if tournament is None:
+            raise HttpError(404, f"找不到賽事: {tournament_id}")
+        return tournament
+
+    # Endpoints; each returns (status, body) where body is a dict or CSV text
+
+    def create(self, data):
+        tournament_id = str(data.get("id") or uuid.uuid4().hex[:12])
+        if not TOURNAMENT_ID.match(tournament_id):
+            raise HttpError(400, "賽事代號只能包含英數字、底線與連字號！")
+        if tournament_id in self.tournaments:
+            raise HttpError(409, f"賽事已存在: {tournament_id}")
+        pairing = data.get("pairing", PAIRING_GREEDY)
+        if pairing not in (PAIRING_GREEDY, PAIRING_MATCHING):
+            raise ValueError(f"未知的配對模式: {pairing}")
+        names = data.get("players", [])
+        if not isinstance(names, list):
+            raise ValueError("players 必須是玩家名稱陣列！")
+        rounds = _int_field(data, "rounds", 0)
+        seed = data.get("seed")
+        if seed is not None and not isinstance(seed, (int, str)):
+            raise ValueError("seed 必須是整數或字串！")
+        engine = TournamentEngine(seed=seed, pairing_mode=pairing)
+        ratings = None
+        if data.get("ratings"):
+            from swiss_rating import RatingTable
+            if not isinstance(data["ratings"], dict):
+                raise ValueError("評分必須是 {玩家: 評分} 物件！")
+            try:
+                ratings = RatingTable.from_ratings({str(name): value for name, value in data["ratings"].items()})
+            except (TypeError, ValueError, IndexError):
+                raise ValueError("評分格式錯誤！")
+            engine.seed_ratings = ratings.seed_ratings()
+        journal = None
+        if self.journal_dir:
+            journal = Journal(os.path.join(self.journal_dir, tournament_id))
+            journal.attach(engine)
+        try:
+            engine.setup([str(name) for name in names], rounds)
+            if journal:
+                ratings_path = os.path.join(journal.directory, RATINGS_FILE)
+                if ratings is not None:
+                    ratings.save(ratings_path)
+                elif os.path.exists(ratings_path):
+                    # Left by an earlier event under the same id
+                    os.remove(ratings_path)
+            tournament = Tournament(tournament_id, engine, journal, ratings)
+        except Exception:
+            # Stops the journal's sync thread whatever went wrong
+            if journal:
+                journal.close()
+            raise
+        self.tournaments[tournament_id] = tournament
+        return 201, tournament.summary()
+
+    def delete(self, tournament):
+        del self.tournaments[tournament.id]
+        tournament.discard()
+        return 200, {"deleted": tournament.id}
+
+    def add_players(self, tournament, data):
+        tournament.engine.add_players([str(name) for name in data.get("names", [])])
+        return 200, tournament.summary()
+
+    async def pair(self, tournament, data):
+        engine = tournament.engine
+        if engine.current_round > 0 and not engine.results_confirmed:
+            raise ValueError("請先確認當前輪次的比賽結果！")
+        if engine.is_finished():
+            raise ValueError("所有輪次已完成！")
+        mode = data.get("pairing") or engine.pairing_mode
+        round_num = engine.current_round + 1
+        if self.pool and len(engine.players) >= self.pool_min_players:
+            state = engine.snapshot()
+            # Pairing never looks at the match history
+            state["match_history"] = []
+            loop = asyncio.get_running_loop()
+            pairs, bye_id, fell_back = await loop.run_in_executor(
+                self.pool, _pair_in_worker, state, round_num, mode, engine.rng.getrandbits(64), engine.matching_time_budget,
+                engine.seed_ratings)
+            players = engine.players
+            engine.load_round(round_num, [(players[a], players[b]) for a, b in pairs],
+                              players[bye_id] if bye_id is not None else None, fell_back)
+        else:
+            engine.start_round(mode)
+        return 200, self.round_view(engine)
+
+    def round_view(self, engine):
+        return {
+            "round": engine.current_round,
+            "pairs": [[table, p1.name, p2.name] for table, (p1, p2) in enumerate(engine.paired_matches, 1)],
+            "bye": engine.bye_player.name if engine.bye_player else None,
+            "fell_back": engine.pairing_fell_back
+        }
+
+    def results(self, tournament, data):
+        engine = tournament.engine
+        if engine.current_round == 0 or engine.results_confirmed:
+            raise ValueError("請先進行配對！")
+        if "lines" in data:
+            results = engine.parse_result_lines(str(data["lines"]).splitlines())
+        else:
+            results = [str(result) for result in data.get("results", [])]
+        engine.record_results(results)
+        return 200, tournament.summary()
+
+    def versions(self, tournament):
+        history = tournament.engine.history
+        rows = [{"id": version.id, "parent": version.parent.id if version.parent else None, "label": version.label,
+                 "depth": depth, "current_path": on_path} for version, depth, on_path in history.branches()]
+        return 200, {"current": history.current.id, "versions": rows}
+
+    def standings(self, tournament):
+        engine = tournament.engine
+        tiebreaks = engine.tiebreaks()
+        rows = []
+        for rank, player in enumerate(engine.standings(), 1):
+            rows.append({"rank": rank, "name": player.name, "points": player.points, "wins": player.wins,
+                         "losses": player.losses, "ties": player.ties, "omw": tiebreaks.omw[player.id],
+                         "oomw": tiebreaks.oomw[player.id]})
+        return 200, {"round": engine.current_round, "standings": rows}
+
+    def export(self, tournament):
+        buffer = io.StringIO()
+        if tournament.csv_writer:
+            tournament.csv_writer.write_export(buffer)
+        else:
+            write_csv(buffer, tournament.engine)
+        return 200, buffer.getvalue()
+
+    async def forecast(self, tournament, data):
+        engine = tournament.engine
+        simulations = _int_field(data, "simulations", 1000)
+        if not 1 <= simulations <= MAX_FORECAST_SIMULATIONS:
+            raise ValueError(f"模擬次數須介於 1 到 {MAX_FORECAST_SIMULATIONS}！")
+        top_cut = _int_field(data, "top_cut", 8)
+        from swiss_simulate import live_model
+        model = live_model(engine, tournament.ratings)
+        state = engine.snapshot()
+        state["match_history"] = []
+        seed = engine.rng.getrandbits(64)
+        if self.pool:
+            loop = asyncio.get_running_loop()
+            rows = await loop.run_in_executor(self.pool, _forecast_in_worker, state, engine.pairing_mode, model,
+                                              simulations, top_cut, seed)
+        else:
+            rows = await asyncio.to_thread(_forecast_in_worker, state, engine.pairing_mode, model, simulations, top_cut, seed)
+        return 200, {"round": engine.current_round, "simulations": simulations, "top_cut": top_cut, "forecast": rows}
+
+    async def dispatch(self, method, path, body):
+        parts = [part for part in path.split("/") if part]
+        if not parts or parts[0] != "tournaments" or len(parts) > 3:
+            raise HttpError(404, f"找不到路徑: {path}")
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HttpError(400, "請求內容不是有效的 JSON！")
+        if not isinstance(data, dict):
+            raise HttpError(400, "請求內容必須是 JSON 物件！")
+
+        if len(parts) == 1:
+            if method == "GET":
+                return 200, {"tournaments": [t.summary() for t in self.tournaments.values()]}
+            if method == "POST":
+                return self.create(data)
+            raise HttpError(405, f"不支援的方法: {method}")
+
+        tournament = self.get(parts[1])
+        action = parts[2] if len(parts) == 3 else None
+        big = len(tournament.engine.players) >= self.pool_min_players
+        async with tournament.lock:
+            if self.tournaments.get(tournament.id) is not tournament:
+                # Deleted while this request waited for the lock
+                raise HttpError(404, f"找不到賽事: {tournament.id}")
+            if action is None and method == "GET":
+                return 200, tournament.summary()
+            if action is None and method == "DELETE":
+                return self.delete(tournament)
+            if action == "players" and method == "POST":
+                return self.add_players(tournament, data)
+            if action == "pair" and method == "POST":
+                return await self.pair(tournament, data)
+            if action == "results" and method == "POST":
+                return self.results(tournament, data)
+            if action in ("undo", "redo") and method == "POST":
+                getattr(tournament.engine, action)()
+                return 200, tournament.summary()
+            if action == "versions" and method == "GET":
+                return self.versions(tournament)
+            if action == "checkout" and method == "POST":
+                tournament.engine.checkout(_int_field(data, "version", -1))
+                return 200, tournament.summary()
+            if action == "standings" and method == "GET":
+                if big:
+                    return await asyncio.to_thread(self.standings, tournament)
+                return self.standings(tournament)
+            if action == "forecast" and method == "POST":
+                return await self.forecast(tournament, data)
+            if action == "export" and method == "GET":
+                if big:
+                    return await asyncio.to_thread(self.export, tournament)
+                return self.export(tournament)
+        raise HttpError(404, f"找不到路徑: {method} {path}")
+
+    async def respond(self, method, path, body):
+        try:
+            status, payload = await self.dispatch(method, path, body)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        if isinstance(payload, str):
+            return status, "text/csv; charset=utf-8", payload.encode('utf-8')
+        return status, "application/json; charset=utf-8", json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    async def serve_connection(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive; enough for local clients and the
+        # load test, not meant to face the internet
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if length > MAX_BODY:
+                    status, content_type = 413, "application/json; charset=utf-8"
+                    payload = json.dumps({"error": "請求內容過大！"}, ensure_ascii=False).encode('utf-8')
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, content_type, payload = await self.respond(method.upper(), urlsplit(target).path, body)
+                writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                              f"Content-Type: {content_type}\r\n"
+                              f"Content-Length: {len(payload)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, journal_dir=None, pool_min_players=POOL_MIN_PLAYERS, ready=None):
+    service = TournamentService(workers, journal_dir, pool_min_players)
+    recovered = service.recover()
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    print(f"瑞士輪服務已啟動: http://{host}:{port}（復原 {recovered} 場賽事）", flush=True)
+    if ready:
+        ready()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="瑞士輪多賽事服務")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="配對用的行程數（0 表示不使用行程池）")
+    parser.add_argument("--pool-min-players", type=int, default=POOL_MIN_PLAYERS, help="人數達此值才交給行程池配對")
+    parser.add_argument("--journal-dir", help="每場賽事的記錄目錄，重啟時自動復原")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.journal_dir, args.pool_min_players))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from swiss_csv import import_csv
+from swiss_engine import TournamentEngine, DOUBLE_LOSS
+from swiss_pairing import PAIRING_GREEDY, PAIRING_MATCHING
+
+# Monte Carlo runs of complete Swiss events through TournamentEngine, spread
+# over a process pool. Every event gets its own random.Random seeded from
+# (seed, event index), so results do not depend on the worker count.
+#
+#   python swiss_simulate.py --events 100000 --players 256 --rounds 8 --top-cut 8
+#
+# forecast() plays out the remaining rounds of an event in progress instead,
+# with outcomes from the players' ratings (swiss_rating) updated by the
+# rounds already played. swiss_rating needs numpy, so it is imported only
+# when ratings are used:
+#
+#   python swiss_simulate.py --forecast live.csv --ratings ratings.json --rounds 8 --events 2000
+
+class OutcomeModel:
+    # Decides single matches between seeds i and j (0 = top seed).
+    def __init__(self, double_loss=0.0):
+        self.double_loss = double_loss
+
+    def new_event(self, n_players, rng):
+        pass
+
+    def win_probability(self, i, j):
+        raise NotImplementedError
+
+    def play(self, i, j, rng):
+        # True if seed i wins, False if seed j wins, None for a double loss
+        r = rng.random()
+        if r < self.double_loss:
+            return None
+        return r - self.double_loss < self.win_probability(i, j) * (1.0 - self.double_loss)
+
+class CoinFlip(OutcomeModel):
+    def win_probability(self, i, j):
+        return 0.5
+
+class FixedWinProbability(OutcomeModel):
+    # The better seed wins with probability p
+    def __init__(self, p=0.6, double_loss=0.0):
+        super().__init__(double_loss)
+        self.p = p
+
+    def win_probability(self, i, j):
+        return self.p if i < j else 1.0 - self.p
+
+class RatingModel(OutcomeModel):
+    # Elo expectation. Without fixed ratings each event draws a fresh field
+    # from N(mean, spread), sorted so seed 0 is the strongest. With rating
+    # deviations (swiss_rating.RatingTable) uncertain ratings are pulled
+    # toward an even match.
+    def __init__(self, ratings=None, mean=1500.0, spread=200.0, scale=400.0, double_loss=0.0, deviations=None):
+        super().__init__(double_loss)
+        self.fixed_ratings = ratings
+        self.mean = mean
+        self.spread = spread
+        self.scale = scale
+        self.ratings = ratings
+        self.deviations = deviations
+
+    def new_event(self, n_players, rng):
+        if self.fixed_ratings is None:
+            self.ratings = sorted((rng.gauss(self.mean, self.spread) for _ in range(n_players)), reverse=True)
+
+    def win_probability(self, i, j):
+        if self.deviations is not None:
+            from swiss_rating import win_probability
+            return win_probability(self.ratings[i], self.ratings[j], self.deviations[i], self.deviations[j])
+        return 1.0 / (1.0 + math.pow(10.0, (self.ratings[j] - self.ratings[i]) / self.scale))
+
+OUTCOME_MODELS = {
+    "coin": CoinFlip,
+    "fixed": FixedWinProbability,
+    "rating": RatingModel
+}
+
+class SimulationStats:
+    def __init__(self):
+        self.events = 0
+        self.matches = 0
+        self.rematches = 0
+        self.down_pairs = 0
+        self.unpaired = 0
+        self.pairing_fallbacks = 0
+        self.record_players = Counter()
+        self.record_top_cut = Counter()
+        self.bracket_sizes = Counter()
+
+    def merge(self, other):
+        self.events += other.events
+        self.matches += other.matches
+        self.rematches += other.rematches
+        self.down_pairs += other.down_pairs
+        self.unpaired += other.unpaired
+        self.pairing_fallbacks += other.pairing_fallbacks
+        self.record_players.update(other.record_players)
+        self.record_top_cut.update(other.record_top_cut)
+        self.bracket_sizes.update(other.bracket_sizes)
+        return self
+
+    def to_dict(self):
+        records = sorted(self.record_players, key=lambda r: tuple(-int(x) if k == 0 else int(x) for k, x in enumerate(r.split("-"))))
+        brackets = {}
+        for (record, size), count in sorted(self.bracket_sizes.items()):
+            brackets.setdefault(record, {})[size] = count / self.events
+        return {
+            "events": self.events,
+            "matches": self.matches,
+            "rematch_rate": self.rematches / self.matches if self.matches else 0.0,
+            "down_pair_rate": self.down_pairs / self.matches if self.matches else 0.0,
+            "events_with_unpaired_player": self.unpaired / self.events if self.events else 0.0,
+            "pairing_fallbacks": self.pairing_fallbacks,
+            "top_cut_probability": {r: self.record_top_cut[r] / self.record_players[r] for r in records},
+            "bracket_size_frequency": {r: brackets.get(r, {}) for r in records}
+        }
+
+def simulate_event(n_players, rounds, top_cut, model, seed, pairing_mode=PAIRING_GREEDY, stats=None):
+    stats = stats or SimulationStats()
+    rng = random.Random(seed)
+    engine = TournamentEngine(rounds, seed=rng.getrandbits(64), pairing_mode=pairing_mode)
+    engine.setup([f"P{i:05d}" for i in range(n_players)], rounds)
+    seeds = {p: i for i, p in enumerate(engine.players)}
+    model.new_event(n_players, rng)
+
+    unpaired = False
+    while not engine.is_finished():
+        paired = engine.start_round()
+        stats.pairing_fallbacks += engine.pairing_fell_back
+        if 2 * len(paired) + (engine.bye_player is not None) < n_players:
+            unpaired = True
+        results = []
+        for p1, p2 in paired:
+            stats.matches += 1
+            if p1.points != p2.points:
+                stats.down_pairs += 1
+            if p1.opponents.count(p2) > 1:
+                stats.rematches += 1
+            outcome = model.play(seeds[p1], seeds[p2], rng)
+            results.append(DOUBLE_LOSS if outcome is None else (p1.name if outcome else p2.name))
+        engine.record_results(results)
+
+    standings = engine.standings()
+    records = Counter()
+    for rank, player in enumerate(standings):
+        record = f"{player.wins}-{player.losses}"
+        records[record] += 1
+        if rank < top_cut:
+            stats.record_top_cut[record] += 1
+    stats.record_players.update(records)
+    for record, size in records.items():
+        stats.bracket_sizes[(record, size)] += 1
+    stats.unpaired += unpaired
+    stats.events += 1
+    return stats
+
+def _simulate_batch(args):
+    n_players, rounds, top_cut, model, seed, first, count, pairing_mode = args
+    stats = SimulationStats()
+    for i in range(first, first + count):
+        simulate_event(n_players, rounds, top_cut, model, f"{seed}:{i}", pairing_mode, stats)
+    return stats
+
+def simulate(n_events, n_players, rounds, top_cut=8, model=None, workers=None, seed=0, pairing_mode=PAIRING_GREEDY, batch_size=None):
+    model = model or CoinFlip()
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or max(1, min(1000, n_events // (workers * 4) or 1))
+    batches = [(n_players, rounds, top_cut, model, seed, first, min(batch_size, n_events - first), pairing_mode)
+               for first in range(0, n_events, batch_size)]
+    stats = SimulationStats()
+    if workers == 1:
+        for batch in batches:
+            stats.merge(_simulate_batch(batch))
+        return stats
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch_stats in pool.map(_simulate_batch, batches):
+            stats.merge(batch_stats)
+    return stats
+
+class ForecastStats:
+    # Per player id sums over simulated finishes
+    def __init__(self, n_players):
+        self.simulations = 0
+        self.points = [0] * n_players
+        self.top_cut = [0] * n_players
+        self.ranks = [0] * n_players
+
+    def merge(self, other):
+        self.simulations += other.simulations
+        for totals, extra in ((self.points, other.points), (self.top_cut, other.top_cut), (self.ranks, other.ranks)):
+            for i, value in enumerate(extra):
+                totals[i] += value
+        return self
+
+def live_model(engine, ratings=None, double_loss=0.0):
+    # RatingModel over engine's player ids: ratings (a RatingTable of past
+    # events, or None) updated with the rounds played so far
+    from swiss_rating import RatingTable
+    table = ratings.copy() if ratings is not None else RatingTable()
+    table.rate_engine(engine)
+    values, deviations = table.for_players(engine.players)
+    return RatingModel(values, deviations=deviations, double_loss=double_loss)
+
+def play_round(engine, model, rng):
+    results = []
+    for p1, p2 in engine.paired_matches:
+        outcome = model.play(p1.id, p2.id, rng)
+        results.append(DOUBLE_LOSS if outcome is None else (p1.name if outcome else p2.name))
+    engine.record_results(results)
+
+def _forecast_batch(args):
+    state, top_cut, model, seed, first, count, pairing_mode = args
+    stats = ForecastStats(len(state["players"]))
+    for k in range(first, first + count):
+        rng = random.Random(f"{seed}:{k}")
+        engine = TournamentEngine(state["rounds"], seed=rng.getrandbits(64), pairing_mode=pairing_mode)
+        engine.restore(state)
+        if engine.current_round > 0 and not engine.results_confirmed:
+            play_round(engine, model, rng)
+        while not engine.is_finished():
+            engine.start_round()
+            play_round(engine, model, rng)
+        for rank, player in enumerate(engine.standings(), 1):
+            stats.points[player.id] += player.points
+            stats.ranks[player.id] += rank
+            if rank <= top_cut:
+                stats.top_cut[player.id] += 1
+        stats.simulations += 1
+    return stats
+
+def forecast(engine, model=None, simulations=1000, top_cut=8, workers=None, seed=0, batch_size=None):
+    # Plays the rest of engine's event simulations times from its current
+    # state (engine itself is not touched). model decides matches between
+    # player ids, default live_model(engine). Returns one dict per player in
+    # current standings order.
+    model = model or live_model(engine)
+    state = engine.snapshot()
+    # Pairing never looks at the match history
+    state["match_history"] = []
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or max(1, min(200, simulations // (workers * 4) or 1))
+    batches = [(state, top_cut, model, seed, first, min(batch_size, simulations - first), engine.pairing_mode)
+               for first in range(0, simulations, batch_size)]
+    stats = ForecastStats(len(engine.players))
+    if workers == 1:
+        for batch in batches:
+            stats.merge(_forecast_batch(batch))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch_stats in pool.map(_forecast_batch, batches):
+                stats.merge(batch_stats)
+    n = stats.simulations or 1
+    rows = []
+    for rank, player in enumerate(engine.standings(), 1):
+        rows.append({
+            "rank": rank,
+            "name": player.name,
+            "points": player.points,
+            "rating": model.ratings[player.id],
+            "expected_points": stats.points[player.id] / n,
+            "expected_rank": stats.ranks[player.id] / n,
+            "top_cut_probability": stats.top_cut[player.id] / n
+        })
+    return rows
+
+def main_forecast(args):
+    from swiss_rating import RatingTable
+    engine = import_csv(args.forecast, args.rounds)
+    ratings = RatingTable.load(args.ratings) if args.ratings else None
+    model = live_model(engine, ratings, args.double_loss)
+    start = time.perf_counter()
+    rows = forecast(engine, model, args.events, args.top_cut, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"第 {engine.current_round}/{engine.rounds} 輪後預測，模擬 {args.events} 次，耗時 {elapsed:.1f} 秒")
+    print(f"{'排名':<4} | {'玩家':<16} | {'積分':>4} | {'評分':>7} | {'預期積分':>8} | {'預期名次':>8} | {'晉級機率':>8}")
+    for row in rows:
+        print(f"{row['rank']:<4} | {row['name']:<16} | {row['points']:>4} | {row['rating']:>7.1f} | "
+              f"{row['expected_points']:>8.2f} | {row['expected_rank']:>8.1f} | {row['top_cut_probability']:>8.2%}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="瑞士輪蒙地卡羅模擬")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--top-cut", type=int, default=8)
+    parser.add_argument("--model", choices=list(OUTCOME_MODELS), default="coin")
+    parser.add_argument("--win-probability", type=float, default=0.6, help="fixed 模型中較高種子的勝率")
+    parser.add_argument("--rating-spread", type=float, default=200.0)
+    parser.add_argument("--double-loss", type=float, default=0.0)
+    parser.add_argument("--pairing", choices=[PAIRING_GREEDY, PAIRING_MATCHING], default=PAIRING_GREEDY)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="將結果寫入 JSON 檔")
+    parser.add_argument("--forecast", help="預測進行中的賽事（匯出的 CSV 檔）；--events 為模擬次數")
+    parser.add_argument("--ratings", help="swiss_rating.py 儲存的評分 JSON")
+    args = parser.parse_args()
+
+    if args.forecast:
+        main_forecast(args)
+        return
+
+    if args.model == "fixed":
+        model = FixedWinProbability(args.win_probability, double_loss=args.double_loss)
+    elif args.model == "rating":
+        model = RatingModel(spread=args.rating_spread, double_loss=args.double_loss)
+    else:
+        model = CoinFlip(double_loss=args.double_loss)
+
+    start = time.perf_counter()
+    stats = simulate(args.events, args.players, args.rounds, args.top_cut, model, args.workers, args.seed, args.pairing)
+    elapsed = time.perf_counter() - start
+    summary = stats.to_dict()
+
+    print(f"模擬 {stats.events} 場賽事（{args.players} 人，{args.rounds} 輪），耗時 {elapsed:.1f} 秒")
+    print(f"重複對戰率: {summary['rematch_rate']:.4f}  降組配對率: {summary['down_pair_rate']:.4f}")
+    print(f"{'戰績':<8} | {'晉級機率':>8} | 常見人數")
+    for record, probability in summary["top_cut_probability"].items():
+        sizes = summary["bracket_size_frequency"][record]
+        common = sorted(sizes.items(), key=lambda x: -x[1])[:3]
+        common_text = ", ".join(f"{size}人 {freq:.0%}" for size, freq in common)
+        print(f"{record:<8} | {probability:>8.2%} | {common_text}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
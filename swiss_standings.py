@@ -0,0 +1,127 @@
+import bisect
+
+# Players kept in standings order between views, so the GUI, exports and
+# pairing stop re-sorting the whole field each time they look at it.
+#
+# Each player has a sort key (-points, -OMW, -OOMW, id); ascending keys give
+# the same order as a stable sort on (points, OMW, OOMW) descending, because
+# players are stored in id order. The engine marks a player dirty when their
+# own record or opponent list changes. A key also depends on opponents'
+# records (OMW) and on their opponents' (OOMW), so refresh() widens the dirty
+# set by that many levels of opponents and repositions only those players,
+# unless so many changed (a whole round was just recorded) that one re-sort
+# of nearly-sorted keys is cheaper.
+
+# Re-sort instead of repositioning once more than 1/REBUILD_FRACTION of the
+# field is dirty
+REBUILD_FRACTION = 8
+
+class StandingsIndex:
+    def __init__(self, players, key, all_keys=None, depth=1):
+        # players: the engine's list, indexed by id; key(player) -> sort key;
+        # all_keys() -> every player's key in id order, for rebuilds; depth:
+        # levels of opponents a key reads
+        self.players = players
+        self.key = key
+        self.all_keys = all_keys
+        self.depth = depth
+        self.keys = []
+        self.key_of = {}
+        self.dirty = set()
+        self.stale = True
+        self.ordered = None
+
+    def mark(self, player):
+        self.dirty.add(player.id)
+
+    def mark_many(self, players):
+        if len(players) * REBUILD_FRACTION > len(self.players):
+            self.stale = True
+            return
+        for player in players:
+            self.dirty.add(player.id)
+
+    def mark_matches(self, matches):
+        # After a batch of results; a full round is going to be re-sorted
+        # anyway, so skip collecting the players
+        if 2 * len(matches) * REBUILD_FRACTION > len(self.players):
+            self.stale = True
+            return
+        for p1, p2 in matches:
+            self.dirty.add(p1.id)
+            self.dirty.add(p2.id)
+
+    def invalidate(self):
+        self.stale = True
+
+    def rebuild(self):
+        if self.all_keys is not None:
+            keys = self.all_keys()
+        else:
+            key = self.key
+            keys = [key(p) for p in self.players]
+        self.key_of = dict(enumerate(keys))
+        self.keys = sorted(keys)
+        self.dirty.clear()
+        self.stale = False
+        self.ordered = None
+
+    def affected(self):
+        # The dirty players and everyone within depth opponents of them, or
+        # None once that is too many to reposition one by one
+        players = self.players
+        limit = len(players) // REBUILD_FRACTION
+        affected = set(self.dirty)
+        frontier = affected
+        for _ in range(self.depth):
+            reached = set()
+            for player_id in frontier:
+                for opp in players[player_id].opponents:
+                    if opp.id not in affected:
+                        reached.add(opp.id)
+            affected |= reached
+            if len(affected) > limit:
+                return None
+            frontier = reached
+        return affected
+
+    def refresh(self):
+        if self.stale or len(self.key_of) != len(self.players) or len(self.dirty) * REBUILD_FRACTION > len(self.players):
+            self.rebuild()
+            return
+        if not self.dirty:
+            return
+        affected = self.affected()
+        if affected is None:
+            self.rebuild()
+            return
+        keys = self.keys
+        key_of = self.key_of
+        players = self.players
+        for player_id in affected:
+            old = key_of[player_id]
+            new = self.key(players[player_id])
+            if new != old:
+                del keys[bisect.bisect_left(keys, old)]
+                bisect.insort(keys, new)
+                key_of[player_id] = new
+                self.ordered = None
+        self.dirty.clear()
+
+    def standings(self):
+        # A new list each call; callers are free to shuffle or slice it
+        self.refresh()
+        if self.ordered is None:
+            players = self.players
+            self.ordered = [players[k[-1]] for k in self.keys]
+        return list(self.ordered)
+
+    def rank(self, player):
+        # 1-based position in the standings
+        self.refresh()
+        return bisect.bisect_left(self.keys, self.key_of[player.id]) + 1
+
+    def top(self, n):
+        self.refresh()
+        players = self.players
+        return [players[k[-1]] for k in self.keys[:n]]
@@ -0,0 +1,156 @@
+import numpy as np
+
+from swiss_engine import RESULT_P1_WIN, RESULT_P2_WIN
+from swiss_tiebreak import TIE_MATCH_POINTS, WIN_MATCH_POINTS, tiebreak_scale
+
+# Struct-of-arrays player table for simulation batches and very large
+# leagues. Players are dense integer ids (row numbers); the opponent history
+# is a (players x rounds) id matrix padded with -1. OMW, standings and the
+# OMW rating bands are computed for the whole field at once, with the same
+# tiebreak rules as swiss_tiebreak. Standings order on the exact OMW/OOMW
+# integers; they are int64 while 3 x scale^3 fits and Python ints after that.
+
+# Same bands as SwissSimulatorGUI.get_omw_rating: omw <= 0.4 is 偏弱, etc.
+OMW_RATING_THRESHOLDS = np.array([0.4, 0.5, 0.6, 0.7])
+OMW_RATING_LABELS = np.array(["偏弱", "正常", "偏強", "高手", "地獄"])
+
+class PlayerTable:
+    def __init__(self, names, max_rounds):
+        n = len(names)
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.points = np.zeros(n, dtype=np.int32)
+        self.wins = np.zeros(n, dtype=np.int32)
+        self.losses = np.zeros(n, dtype=np.int32)
+        self.ties = np.zeros(n, dtype=np.int32)
+        self.byes = np.zeros(n, dtype=np.int32)
+        self.opponents = np.full((n, max_rounds), -1, dtype=np.int32)
+        self.n_opponents = np.zeros(n, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_players(cls, players, max_rounds=None):
+        max_rounds = max_rounds or max([len(p.opponents) for p in players] + [1])
+        table = cls([p.name for p in players], max_rounds)
+        index = table.index
+        for i, p in enumerate(players):
+            table.points[i] = p.points
+            table.wins[i] = p.wins
+            table.losses[i] = p.losses
+            table.ties[i] = p.ties
+            table.byes[i] = getattr(p, "byes", 0)
+            opp_ids = [index[o.name] for o in p.opponents]
+            table.opponents[i, :len(opp_ids)] = opp_ids
+            table.n_opponents[i] = len(opp_ids)
+        return table
+
+    @classmethod
+    def from_engine(cls, engine):
+        return cls.from_players(engine.players, max(engine.rounds, max([len(p.opponents) for p in engine.players] + [1])))
+
+    def ids(self, names):
+        return np.array([self.index[name] for name in names], dtype=np.int32)
+
+    def add_matches(self, p1, p2):
+        # p1, p2: equal-length id arrays for one round; each id appears once
+        p1 = np.asarray(p1, dtype=np.int32)
+        p2 = np.asarray(p2, dtype=np.int32)
+        if np.any(self.n_opponents[p1] >= self.opponents.shape[1]) or np.any(self.n_opponents[p2] >= self.opponents.shape[1]):
+            self.opponents = np.hstack([self.opponents, np.full_like(self.opponents, -1)])
+        self.opponents[p1, self.n_opponents[p1]] = p2
+        self.opponents[p2, self.n_opponents[p2]] = p1
+        self.n_opponents[p1] += 1
+        self.n_opponents[p2] += 1
+
+    def record_results(self, p1, p2, results):
+        # results: RESULT_P1_WIN / RESULT_P2_WIN / RESULT_DOUBLE_LOSS per pair
+        p1 = np.asarray(p1, dtype=np.int32)
+        p2 = np.asarray(p2, dtype=np.int32)
+        results = np.asarray(results)
+        p1_won = results == RESULT_P1_WIN
+        p2_won = results == RESULT_P2_WIN
+        winners = np.concatenate([p1[p1_won], p2[p2_won]])
+        losers = np.concatenate([p2[p1_won], p1[p2_won], p1[~(p1_won | p2_won)], p2[~(p1_won | p2_won)]])
+        np.add.at(self.wins, winners, 1)
+        np.add.at(self.points, winners, 1)
+        np.add.at(self.losses, losers, 1)
+
+    def record_byes(self, ids):
+        ids = np.asarray(ids, dtype=np.int32)
+        np.add.at(self.wins, ids, 1)
+        np.add.at(self.points, ids, 1)
+        np.add.at(self.byes, ids, 1)
+
+    def win_percent(self):
+        played = self.wins + self.losses + self.ties
+        match_points = WIN_MATCH_POINTS * self.wins + TIE_MATCH_POINTS * self.ties
+        return np.divide(match_points, WIN_MATCH_POINTS * played, out=np.zeros(len(self), dtype=np.float64), where=played > 0)
+
+    def scale(self):
+        # swiss_tiebreak.tiebreak_scale for the most matches anyone has had
+        played = self.wins + self.losses + self.ties
+        return tiebreak_scale(int(max(played.max(initial=0), self.n_opponents.max(initial=0))))
+
+    def units_dtype(self, scale):
+        return np.int64 if WIN_MATCH_POINTS * scale ** 3 < 2 ** 63 else object
+
+    def opponent_mean_units(self, values, scale):
+        # Mean of values over each player's opponents, times scale so it stays
+        # an integer; 0 for no opponents. Padding entries are -1, which picks
+        # up the trailing 0
+        totals = np.append(values, values.dtype.type(0))[self.opponents].sum(axis=1)
+        counts = np.maximum(self.n_opponents, 1).astype(values.dtype)
+        return np.where(self.n_opponents > 0, totals * (np.asarray(scale, dtype=values.dtype) // counts), 0).astype(values.dtype)
+
+    def omw_units(self, current_round=None, scale=None):
+        # Exact OMW% x 3 x scale^2
+        scale = self.scale() if scale is None else scale
+        dtype = self.units_dtype(scale)
+        if current_round == 0:
+            return np.zeros(len(self), dtype=dtype)
+        played = self.wins + self.losses + self.ties
+        # Floored MW% as numerator / (3 x played), see opponent_win_share
+        numerators = np.where(played > 0, np.maximum(WIN_MATCH_POINTS * self.wins + TIE_MATCH_POINTS * self.ties, played), 1)
+        shares = numerators.astype(dtype) * (np.asarray(scale, dtype=dtype) // np.maximum(played, 1).astype(dtype))
+        return self.opponent_mean_units(shares, scale)
+
+    def oomw_units(self, omw_units, scale=None):
+        # Exact OOMW% x 3 x scale^3
+        scale = self.scale() if scale is None else scale
+        return self.opponent_mean_units(omw_units, scale)
+
+    def omw(self, current_round=None):
+        scale = self.scale()
+        return self.units_value(self.omw_units(current_round, scale), WIN_MATCH_POINTS * scale * scale)
+
+    def oomw(self, current_round=None):
+        scale = self.scale()
+        return self.units_value(self.oomw_units(self.omw_units(current_round, scale), scale), WIN_MATCH_POINTS * scale ** 3)
+
+    def units_value(self, units, denominator):
+        # Floats for display
+        return (units / denominator).astype(np.float64)
+
+    def standings_order(self, omw_units=None, oomw_units=None):
+        # Ids by (points, OMW, OOMW) descending; ties keep id order like the
+        # engine's standings.
+        scale = self.scale()
+        omw_units = self.omw_units(scale=scale) if omw_units is None else omw_units
+        oomw_units = self.oomw_units(omw_units, scale) if oomw_units is None else oomw_units
+        return np.lexsort((-oomw_units, -omw_units, -self.points))
+
+    def omw_ratings(self, omw=None):
+        omw = self.omw() if omw is None else omw
+        return OMW_RATING_LABELS[np.searchsorted(OMW_RATING_THRESHOLDS, omw, side="left")]
+
+    def standings(self, current_round=None):
+        # [(name, points, wins, losses, omw, rating)] in standings order
+        scale = self.scale()
+        omw_units = self.omw_units(current_round, scale)
+        order = self.standings_order(omw_units, self.oomw_units(omw_units, scale))
+        omw = self.units_value(omw_units, WIN_MATCH_POINTS * scale * scale)
+        ratings = self.omw_ratings(omw)
+        return [(self.names[i], int(self.points[i]), int(self.wins[i]), int(self.losses[i]), float(omw[i]), str(ratings[i]))
+                for i in order]
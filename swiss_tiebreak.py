@@ -0,0 +1,73 @@
+import math
+from functools import lru_cache
+
+# Standard tiebreak chain after points:
+#
+#   MW%    match points / (3 x matches played); a win is 3 match points, a tie
+#          1 and a loss (including 雙敗, a loss for both players) 0. A bye
+#          counts as a win in the player's own record.
+#   OMW%   mean MW% of the player's opponents, each floored at 1/3 so that
+#          playing someone who dropped to 0-5 is not punished twice. Byes are
+#          not opponents and take no part.
+#   OOMW%  mean OMW% of the player's opponents.
+#
+# OMW% is kept incrementally on Player (see swiss_engine); compute_tiebreaks
+# derives OOMW% for the whole field from it in one pass over the opponent
+# lists, O(matches played), instead of walking two levels of opponents per
+# player.
+#
+# All three are kept exact. A floored MW% is numerator / (3 x played); over
+# the common denominator 3 x scale, where scale = tiebreak_scale(most matches
+# and byes anyone has had) is a multiple of every played and opponent count,
+# MW% sums are integers, and so are OMW% and OOMW% over 3 x scale^2 and
+# 3 x scale^3. Standings compare those integers; floats are for display.
+
+MIN_MATCH_WIN_PERCENT = 1 / 3
+WIN_MATCH_POINTS = 3
+TIE_MATCH_POINTS = 1
+
+def match_win_percent(wins, losses, ties):
+    played = wins + losses + ties
+    if played == 0:
+        return 0.0
+    return (WIN_MATCH_POINTS * wins + TIE_MATCH_POINTS * ties) / (WIN_MATCH_POINTS * played)
+
+def opponent_win_share(wins, losses, ties):
+    # What a player contributes to their opponents' OMW%, as (numerator,
+    # played) for numerator / (3 x played), floored at 1/3; (1, 1) before the
+    # first match
+    played = wins + losses + ties
+    if played == 0:
+        return 1, 1
+    return max(WIN_MATCH_POINTS * wins + TIE_MATCH_POINTS * ties, played), played
+
+@lru_cache(maxsize=None)
+def tiebreak_scale(max_played):
+    # lcm(1..max_played)
+    return math.lcm(*range(1, max_played + 1))
+
+def omw_value(units, scale):
+    return units / (WIN_MATCH_POINTS * scale * scale)
+
+def oomw_value(units, scale):
+    return units / (WIN_MATCH_POINTS * scale * scale * scale)
+
+class Tiebreaks:
+    # Per-player values indexed by player id: omw and oomw for display,
+    # omw_units and oomw_units the exact values for ordering
+    def __init__(self, omw, oomw, omw_units, oomw_units):
+        self.omw = omw
+        self.oomw = oomw
+        self.omw_units = omw_units
+        self.oomw_units = oomw_units
+
+def compute_tiebreaks(players, get_omw_units, scale):
+    # players: indexed by id; get_omw_units(player) -> exact OMW% over
+    # 3 x scale^2 as the engine reports it
+    omw = [get_omw_units(p) for p in players]
+    oomw = [0] * len(players)
+    for p in players:
+        opponents = p.opponents
+        if opponents:
+            oomw[p.id] = sum(omw[o.id] for o in opponents) * (scale // len(opponents))
+    return Tiebreaks([omw_value(u, scale) for u in omw], [oomw_value(u, scale) for u in oomw], omw, oomw)
@@ -1,535 +1,887 @@
-import math
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import csv
-import os
-from datetime import datetime
-
-class Player:
-    def __init__(self, name):
-        self.name = name
-        self.points = 0
-        self.wins = 0
-        self.losses = 0
-        self.ties = 0
-        self.opponents = []
-
-    def __str__(self):
-        return f"{self.name} ({self.points}分, {self.wins}-{self.losses})"
-
-    def get_omw(self, all_players, current_round):
-        if not self.opponents or current_round == 0:
-            return 0.0
-        total_opponent_win_percent = 0.0
-        for opp in self.opponents:
-            matches_played = opp.wins + opp.losses
-            if matches_played == 0:
-                win_percent = 0.0
-            else:
-                win_percent = opp.wins / matches_played
-            total_opponent_win_percent += win_percent
-        return total_opponent_win_percent / len(self.opponents)
-
-class SwissSimulatorGUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("瑞士輪模擬器")
-        self.root.geometry("1020x700")  # Adjusted default window size
-        self.root.resizable(True, True)
-        self.root.iconbitmap('')
-
-        # Define default fonts
-        self.default_font = ("Arial", 16)
-        self.default_bold_font = ("Arial", 16, "bold")
-        self.mono_font = ("Courier New", 16)
-
-        # Define rating colors
-        self.rating_colors = {
-            "偏弱": "purple",
-            "正常": "green",
-            "偏強": "blue",
-            "高手": "red",
-            "地獄": "black"
-        }
-
-        self.players = []
-        self.rounds = 0
-        self.current_round = 0
-        self.custom_pairs = []
-        self.paired_matches = []
-        self.match_history = []
-        self.results_confirmed = False
-        self.confirm_players_enabled = True
-
-        style = ttk.Style()
-        style.theme_use("clam")
-        style.configure("Red.TButton", foreground="white", background="red", font=self.default_bold_font)
-        style.map("Red.TButton", background=[("active", "darkred")], foreground=[("active", "white")])
-        style.configure("Gold.TButton", foreground="black", background="gold", font=self.default_bold_font)
-        style.map("Gold.TButton", background=[("active", "goldenrod")], foreground=[("active", "black")])
-        style.configure("Large.TButton", font=self.default_bold_font)
-        style.configure("Treeview", font=self.default_font)
-        style.configure("Treeview.Heading", font=self.default_bold_font)
-
-        self.main_frame = ttk.Frame(root, padding="10")
-        self.main_frame.pack(fill="both", expand=True)
-
-        self.left_frame = ttk.LabelFrame(self.main_frame, text="輸入區", padding="5")
-        self.left_frame.pack(side="left", fill="y", padx=5)
-
-        ttk.Label(self.left_frame, text="玩家姓名（每行一個）：", font=self.default_font).pack(anchor="w")
-        self.player_input = scrolledtext.ScrolledText(self.left_frame, width=25, height=10, font=self.default_font)
-        self.player_input.pack(pady=5)
-
-        rounds_frame = ttk.Frame(self.left_frame)
-        rounds_frame.pack(anchor="w", pady=5)
-        ttk.Label(rounds_frame, text="輪次數量：", font=self.default_font).pack(side="left")
-        self.rounds_entry = ttk.Entry(rounds_frame, width=10, font=self.default_font)
-        self.rounds_entry.pack(side="left")
-        self.rounds_entry.insert(0, "4")
-
-        self.confirm_players_button = ttk.Button(self.left_frame, text="確認玩家", command=self.confirm_players, style="Large.TButton")
-        self.confirm_players_button.pack(pady=5)
-        self.custom_first_round_button = ttk.Button(self.left_frame, text="自訂第一輪", command=self.custom_first_round, state="disabled", style="Large.TButton")
-        self.custom_first_round_button.pack(pady=5)
-        self.next_round_button = ttk.Button(self.left_frame, text="下一輪", command=self.next_round, state="disabled", style="Large.TButton")
-        self.next_round_button.pack(pady=5)
-        ttk.Button(self.left_frame, text="排名查詢", command=self.show_rankings, style="Gold.TButton").pack(pady=5)
-
-        bottom_frame = ttk.Frame(self.left_frame)
-        bottom_frame.pack(side="bottom", fill="x", pady=5)
-        ttk.Button(bottom_frame, text="匯出CSV", command=self.export_to_csv, style="Large.TButton").pack(side="left", padx=2)
-        ttk.Button(bottom_frame, text="重新開始", command=self.reset_confirm, style="Red.TButton").pack(side="left", padx=2)
-
-        self.right_frame = ttk.LabelFrame(self.main_frame, text="結果區", padding="5")
-        self.right_frame.pack(side="right", fill="both", expand=True, padx=5)
-
-        # Add current round label on top of the result area
-        self.current_round_label = ttk.Label(self.right_frame, text="目前輪次: 0", font=self.default_bold_font)
-        self.current_round_label.pack(anchor="n", pady=5)
-
-        self.tree = ttk.Treeview(self.right_frame, columns=("Match", "Result"), show="headings", height=15)
-        self.tree.heading("Match", text="配對")
-        self.tree.heading("Result", text="結果")
-        self.tree.column("Match", width=250, anchor="center")
-        self.tree.column("Result", width=250, anchor="center")
-        self.tree.pack(fill="both", expand=True, pady=5)
-
-        self.score_text = scrolledtext.ScrolledText(self.right_frame, width=60, height=40, font=self.mono_font)
-        self.score_text.pack(fill="x", pady=5)
-
-    def get_omw_rating(self, omw):
-        if omw <= 0.4:
-            return "偏弱"
-        elif omw <= 0.5:
-            return "正常"
-        elif omw <= 0.6:
-            return "偏強"
-        elif omw <= 0.7:
-            return "高手"
-        else:
-            return "地獄"
-
-    def confirm_players(self):
-        if not self.confirm_players_enabled:
-            return
-
-        self.players = []
-        names = self.player_input.get("1.0", tk.END).strip().split("\n")
-        names = [name.strip() for name in names if name.strip()]
-        
-        if len(names) != len(set(names)):
-            messagebox.showerror("錯誤", "玩家姓名不得重複！")
-            return
-        
-        for name in names:
-            self.players.append(Player(name))
-        
-        if len(self.players) < 2:
-            messagebox.showerror("錯誤", "至少需要2名玩家！")
-            return
-        
-        try:
-            self.rounds = int(self.rounds_entry.get())
-            if self.rounds <= 0:
-                raise ValueError
-        except ValueError:
-            messagebox.showerror("錯誤", "請輸入有效的輪次數量（大於0）！")
-            return
-
-        self.current_round = 0
-        self.results_confirmed = False
-        self.next_round_button.config(state="normal")
-        if self.current_round == 0:
-            self.custom_first_round_button.config(state="normal")
-        self.tree.delete(*self.tree.get_children())
-        self.score_text.delete("1.0", tk.END)
-        self.score_text.insert(tk.END, f"參賽人數: {len(self.players)}\n")
-        self.score_text.insert(tk.END, f"總輪次: {self.rounds}\n")
-        self.current_round_label.config(text=f"目前輪次: {self.current_round}")  # Update round label
-
-    def custom_first_round(self):
-        if not self.players:
-            messagebox.showerror("錯誤", "請先輸入玩家姓名並確認！")
-            return
-
-        self.confirm_players_enabled = False
-        self.confirm_players_button.config(state="disabled")
-
-        custom_window = tk.Toplevel(self.root)
-        custom_window.title("自訂第一輪配對")
-        custom_window.geometry("500x400")
-        custom_window.resizable(True, True)
-        custom_window.iconbitmap('')
-
-        ttk.Label(custom_window, text="選擇每場比賽的配對：", font=self.default_font).pack(pady=5)
-
-        available_players = [p.name for p in self.players]
-        pair_vars = []
-        comboboxes = []
-
-        def update_options(*args):
-            used_players = set()
-            for p1_var, p2_var in pair_vars:
-                p1 = p1_var.get()
-                p2 = p2_var.get()
-                if p1: used_players.add(p1)
-                if p2: used_players.add(p2)
-            
-            remaining = [name for name in available_players if name not in used_players]
-            for p1_combo, p2_combo in comboboxes:
-                current_p1 = p1_combo.get()
-                current_p2 = p2_combo.get()
-                p1_combo['values'] = [current_p1] + [n for n in remaining if n != current_p1 and n != current_p2] if current_p1 else remaining
-                p2_combo['values'] = [current_p2] + [n for n in remaining if n != current_p1 and n != current_p2] if current_p2 else remaining
-
-        for i in range(len(self.players) // 2):
-            frame = ttk.Frame(custom_window)
-            frame.pack(fill="x", pady=5)
-            ttk.Label(frame, text=f"配對 {i+1}:", font=self.default_font).pack(side="left", padx=5)
-            p1_var = tk.StringVar(value="")
-            p2_var = tk.StringVar(value="")
-            p1_combo = ttk.Combobox(frame, textvariable=p1_var, values=available_players, state="readonly", font=self.default_font)
-            p2_combo = ttk.Combobox(frame, textvariable=p2_var, values=available_players, state="readonly", font=self.default_font)
-            p1_combo.pack(side="left", padx=5)
-            p2_combo.pack(side="left", padx=5)
-            pair_vars.append((p1_var, p2_var))
-            comboboxes.append((p1_combo, p2_combo))
-            p1_var.trace("w", update_options)
-            p2_var.trace("w", update_options)
-
-        def save_pairs():
-            self.custom_pairs = []
-            used_players = set()
-            for p1_var, p2_var in pair_vars:
-                p1_name = p1_var.get()
-                p2_name = p2_var.get()
-                if p1_name and p2_name:
-                    if p1_name == p2_name or p1_name in used_players or p2_name in used_players:
-                        messagebox.showerror("錯誤", "玩家不能重複使用！")
-                        return
-                    p1 = next(p for p in self.players if p.name == p1_name)
-                    p2 = next(p for p in self.players if p.name == p2_name)
-                    self.custom_pairs.append((p1, p2))
-                    p1.opponents.append(p2)
-                    p2.opponents.append(p1)
-                    used_players.add(p1_name)
-                    used_players.add(p2_name)
-
-            if len(used_players) != len(self.players) and len(used_players) + 1 != len(self.players):
-                messagebox.showerror("錯誤", "自訂配對未涵蓋所有玩家，請檢查！")
-                return
-
-            remaining = [p for p in self.players if p.name not in used_players]
-            for i in range(0, len(remaining) - 1, 2):
-                p1, p2 = remaining[i], remaining[i + 1]
-                self.custom_pairs.append((p1, p2))
-                p1.opponents.append(p2)
-                p2.opponents.append(p1)
-            if len(remaining) % 2 == 1:
-                bye_player = remaining[-1]
-                self.score_text.insert(tk.END, f"{bye_player.name} 輪空 (自動獲勝)\n")
-                bye_player.points += 1
-                bye_player.wins += 1
-                self.match_history.append((1, bye_player.name, "輪空", "自動獲勝"))
-            
-            custom_window.destroy()
-
-        ttk.Button(custom_window, text="確認配對", command=save_pairs, style="Large.TButton").pack(pady=10)
-
-    def pair_players(self, round_num):
-        self.tree.delete(*self.tree.get_children())
-        if round_num == 1 and self.custom_pairs:
-            self.score_text.insert(tk.END, f"\n第 {round_num} 輪配對（自訂）：\n")
-            for p1, p2 in self.custom_pairs:
-                self.tree.insert("", "end", values=(f"{p1.name} vs {p2.name}", ""))
-            return self.custom_pairs
-        else:
-            # Use OMW for sorting
-            players = sorted(self.players, key=lambda x: (x.points, x.get_omw(self.players, self.current_round)), reverse=True)
-            import random
-            if round_num == 1:
-                random.shuffle(players)
-            
-            paired = []
-            used = set()
-            self.score_text.insert(tk.END, f"\n第 {round_num} 輪配對：\n")
-            
-            available_players = players.copy()
-            while len(available_players) > 1:
-                p1 = available_players.pop(0)
-                if p1 in used:
-                    continue
-                
-                best_opponent = None
-                min_point_diff = float('inf')
-                best_omw_diff = float('inf')
-                
-                for p2 in available_players:
-                    if p2 not in used and p2 not in p1.opponents:
-                        point_diff = abs(p1.points - p2.points)
-                        omw_diff = abs(p1.get_omw(self.players, self.current_round) - p2.get_omw(self.players, self.current_round))
-                        if point_diff < min_point_diff or (point_diff == min_point_diff and omw_diff < best_omw_diff):
-                            min_point_diff = point_diff
-                            best_omw_diff = omw_diff
-                            best_opponent = p2
-                
-                if best_opponent:
-                    paired.append((p1, best_opponent))
-                    p1.opponents.append(best_opponent)
-                    best_opponent.opponents.append(p1)
-                    used.add(p1)
-                    used.add(best_opponent)
-                    available_players.remove(best_opponent)
-                    self.tree.insert("", "end", values=(f"{p1.name} vs {best_opponent.name}", ""))
-            
-            if available_players:
-                bye_player = available_players[0]
-                self.score_text.insert(tk.END, f"{bye_player.name} 輪空 (自動獲勝)\n")
-                bye_player.points += 1
-                bye_player.wins += 1
-                self.match_history.append((round_num, bye_player.name, "輪空", "自動獲勝"))
-            
-            return paired
-
-    def input_results(self):
-        if not self.paired_matches:
-            messagebox.showerror("錯誤", "請先進行配對！")
-            return
-
-        self.root.title(f"瑞士輪模擬器 - 輸入第 {self.current_round} 輪結果")
-        result_window = tk.Toplevel(self.root)
-        result_window.title(f"輸入第 {self.current_round} 輪結果")
-        window_height = 50 * len(self.paired_matches) + 150
-        result_window.geometry(f"400x{window_height}")
-        result_window.resizable(True, True)
-        result_window.iconbitmap('')
-
-        def on_result_window_close():
-            self.root.title("瑞士輪模擬器")
-            result_window.destroy()
-
-        result_window.protocol("WM_DELETE_WINDOW", on_result_window_close)
-        ttk.Label(result_window, text="選擇每場比賽的結果：", font=self.default_font).pack(pady=5)
-
-        winner_vars = []
-        for p1, p2 in self.paired_matches:
-            frame = ttk.Frame(result_window)
-            frame.pack(fill="x", pady=5)
-            ttk.Label(frame, text=f"{p1.name} vs {p2.name}", font=self.default_font).pack(side="left", padx=5)
-            var = tk.StringVar(value="")
-            ttk.Combobox(frame, textvariable=var, values=[p1.name, p2.name, "雙敗"], state="readonly", font=self.default_font).pack(side="right", padx=5)
-            winner_vars.append(var)
-
-        def save_results():
-            winners = [var.get() for var in winner_vars]
-            if "" in winners:
-                messagebox.showerror("錯誤", "請為每場比賽選擇一個結果！")
-                return
-
-            self.score_text.insert(tk.END, f"第 {self.current_round} 輪結果：\n")
-            for i, (p1, p2) in enumerate(self.paired_matches):
-                result = winners[i]
-                if result == "雙敗":
-                    p1.losses += 1
-                    p2.losses += 1
-                    self.tree.item(self.tree.get_children()[i], values=(f"{p1.name} vs {p2.name}", "雙敗"))
-                    self.tree.tag_configure("double_loss", foreground="red")
-                    self.tree.item(self.tree.get_children()[i], tags="double_loss")
-                else:
-                    winner = p1 if p1.name == result else p2
-                    loser = p2 if p1.name == result else p1
-                    winner.points += 1
-                    winner.wins += 1
-                    loser.losses += 1
-                    self.tree.item(self.tree.get_children()[i], values=(f"{p1.name} vs {p2.name}", f"勝者: {winner.name}"))
-                    self.tree.tag_configure("winner", foreground="green")
-                    self.tree.item(self.tree.get_children()[i], tags="winner")
-                
-                self.match_history.append((self.current_round, p1.name, p2.name, result))
-            
-            self.update_scores()
-            self.results_confirmed = True
-            self.next_round_button.config(state="normal")
-            self.root.title("瑞士輪模擬器")
-            result_window.destroy()
-
-        ttk.Button(result_window, text="確認結果", command=save_results, style="Large.TButton").pack(pady=10)
-
-    def update_scores(self):
-        self.score_text.insert(tk.END, "\n當前積分：\n")
-        sorted_players = sorted(self.players, key=lambda x: (x.points, x.get_omw(self.players, self.current_round)), reverse=True)
-        max_name_length = max(len(player.name) for player in sorted_players) + 2
-        for player in sorted_players:
-            record = f"{player.wins}-{player.losses}"
-            if self.current_round <= 1:
-                omw_display = "--"
-            else:
-                omw_value = player.get_omw(self.players, self.current_round)
-                rating = self.get_omw_rating(omw_value)
-                omw_display = f"{rating}; {omw_value:.2f}"
-            line = f"{player.name:<{max_name_length}} | {record:^10} | {omw_display:>20}\n"
-            self.score_text.insert(tk.END, line)
-
-    def next_round(self):
-        if not self.players:
-            messagebox.showerror("錯誤", "請先輸入玩家姓名並確認！")
-            return
-        
-        if self.current_round > 0 and not self.results_confirmed:
-            messagebox.showerror("錯誤", "請先確認當前輪次的比賽結果！")
-            return
-
-        self.confirm_players_enabled = False
-        self.confirm_players_button.config(state="disabled")
-
-        if self.current_round >= self.rounds:
-            self.score_text.insert(tk.END, "\n最終排名：\n")
-            sorted_players = sorted(self.players, key=lambda x: (x.points, x.get_omw(self.players, self.current_round)), reverse=True)
-            max_name_length = max(len(player.name) for player in sorted_players) + 2
-            for i, player in enumerate(sorted_players, 1):
-                record = f"{player.wins}-{player.losses}"
-                omw_value = player.get_omw(self.players, self.current_round)
-                rating = self.get_omw_rating(omw_value)
-                omw_display = f"{rating}; {omw_value:.2f}"
-                line = f"{i}. {player.name:<{max_name_length}} | {record:^10} | {omw_display:>20}\n"
-                self.score_text.insert(tk.END, line)
-            messagebox.showinfo("完成", "所有輪次已完成！")
-            self.next_round_button.config(state="disabled")
-            return
-
-        self.current_round += 1
-        self.results_confirmed = False
-        self.next_round_button.config(state="disabled")
-        if self.current_round == 1:
-            self.custom_first_round_button.config(state="disabled")
-        self.paired_matches = self.pair_players(self.current_round)
-        self.current_round_label.config(text=f"目前輪次: {self.current_round}")  # Update round label
-        self.input_results()
-
-    def reset_confirm(self):
-        if messagebox.askyesno("確認", "是否要重新開始？所有進度將清空！"):
-            self.players = []
-            self.rounds = 0
-            self.current_round = 0
-            self.custom_pairs = []
-            self.paired_matches = []
-            self.match_history = []
-            self.results_confirmed = False
-            self.next_round_button.config(state="disabled")
-            self.custom_first_round_button.config(state="disabled")
-            self.confirm_players_enabled = True
-            self.confirm_players_button.config(state="normal")
-            self.player_input.delete("1.0", tk.END)
-            self.rounds_entry.delete(0, tk.END)
-            self.rounds_entry.insert(0, "4")
-            self.tree.delete(*self.tree.get_children())
-            self.score_text.delete("1.0", tk.END)
-            self.current_round_label.config(text="目前輪次: 0")  # Reset round label
-
-    def export_to_csv(self):
-        if not self.match_history:
-            messagebox.showerror("錯誤", "目前沒有比賽記錄可匯出！")
-            return
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"swiss_tournament_{timestamp}.csv"
-        
-        try:
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['Round', 'Player1', 'Player2', 'Result']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for match in self.match_history:
-                    writer.writerow({
-                        'Round': match[0],
-                        'Player1': match[1],
-                        'Player2': match[2],
-                        'Result': match[3]
-                    })
-                
-                csvfile.write("\nFinal Standings\n")
-                csvfile.write("Rank,Player,Points,Wins,Losses,Ties,OMW\n")
-                sorted_players = sorted(self.players, key=lambda x: (x.points, x.get_omw(self.players, self.current_round)), reverse=True)
-                for i, player in enumerate(sorted_players, 1):
-                    omw = player.get_omw(self.players, self.current_round)
-                    csvfile.write(f"{i},{player.name},{player.points},{player.wins},{player.losses},{player.ties},{omw:.2f}\n")
-
-            messagebox.showinfo("成功", f"比賽記錄已匯出至 {filename}")
-        except Exception as e:
-            messagebox.showerror("錯誤", f"匯出失敗: {str(e)}")
-
-    def show_rankings(self):
-        if not self.players:
-            messagebox.showerror("錯誤", "請先輸入玩家姓名並確認！")
-            return
-
-        ranking_window = tk.Toplevel(self.root)
-        ranking_window.title("目前排名")
-        ranking_window.geometry("450x500")
-        ranking_window.resizable(True, True)
-        ranking_window.iconbitmap('')
-
-        # Use a Canvas with a Frame to allow per-cell coloring
-        canvas = tk.Canvas(ranking_window)
-        scrollbar = ttk.Scrollbar(ranking_window, orient="vertical", command=canvas.yview)
-        canvas.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
-        canvas.pack(side="left", fill="both", expand=True)
-
-        ranking_frame = ttk.Frame(canvas)
-        canvas.create_window((0, 0), window=ranking_frame, anchor="nw")
-
-        # Headers
-        ttk.Label(ranking_frame, text="排名", font=self.default_bold_font).grid(row=0, column=0, padx=5, pady=5)
-        ttk.Label(ranking_frame, text="玩家", font=self.default_bold_font).grid(row=0, column=1, padx=5, pady=5)
-        ttk.Label(ranking_frame, text="戰績 (勝-負)", font=self.default_bold_font).grid(row=0, column=2, padx=5, pady=5)
-        ttk.Label(ranking_frame, text="對手綜合強度", font=self.default_bold_font).grid(row=0, column=3, padx=5, pady=5)
-
-        # Player data
-        sorted_players = sorted(self.players, key=lambda x: (x.points, x.get_omw(self.players, self.current_round)), reverse=True)
-        for i, player in enumerate(sorted_players, 1):
-            record = f"{player.wins}-{player.losses}"
-            ttk.Label(ranking_frame, text=str(i), font=self.default_font).grid(row=i, column=0, padx=5, pady=2)
-            ttk.Label(ranking_frame, text=player.name, font=self.default_font).grid(row=i, column=1, padx=5, pady=2, sticky="w")
-            ttk.Label(ranking_frame, text=record, font=self.default_font).grid(row=i, column=2, padx=5, pady=2)
-            if self.current_round <= 1:
-                omw_display = "--"
-                color = "black"
-            else:
-                omw_value = player.get_omw(self.players, self.current_round)
-                rating = self.get_omw_rating(omw_value)
-                omw_display = f"{rating}; {omw_value:.2f}"
-                color = self.rating_colors.get(rating, "black")
-            ttk.Label(ranking_frame, text=omw_display, font=self.default_font, foreground=color).grid(row=i, column=3, padx=5, pady=2)
-
-        # Update scroll region
-        ranking_frame.update_idletasks()
-        canvas.configure(scrollregion=canvas.bbox("all"))
-
-        ttk.Button(ranking_frame, text="關閉", command=ranking_window.destroy, style="Large.TButton").grid(row=len(sorted_players) + 1, column=0, columnspan=4, pady=10)
-
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = SwissSimulatorGUI(root)
+import math
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import os
+import threading
+from datetime import datetime
+from swiss_csv import CsvRoundWriter, export_csv, import_csv
+from swiss_engine import TournamentEngine, DOUBLE_LOSS, BYE
+from swiss_journal import Journal
+from swiss_pairing import PAIRING_GREEDY, PAIRING_MATCHING, PairingCancelled
+
+JOURNAL_DIR = "swiss_journal"
+# Rounds with more tables than this open the paste/file result entry
+BULK_ENTRY_THRESHOLD = 16
+# How often the Tk loop checks on a background task, in ms
+TASK_POLL_MS = 50
+
+class TaskCancelled(Exception):
+    pass
+
+class BackgroundTask:
+    # Runs work(task) on a daemon thread. work may call task.report(fraction)
+    # and should poll task.should_stop(); the Tk side reads progress, result
+    # and error from the after() loop, never from the thread.
+    def __init__(self, work):
+        self.work = work
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.done = False
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.result = self.work(self)
+        except Exception as e:
+            self.error = e
+        self.done = True
+
+    def should_stop(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+
+    def report(self, fraction):
+        self.progress = fraction
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set() or isinstance(self.error, (TaskCancelled, PairingCancelled))
+
+class VirtualTable(ttk.Frame):
+    # Row list drawn on a Canvas that only creates items for the rows in
+    # view, so it opens and scrolls at the same speed for 30 or 30000 rows.
+    # rows are tuples of cells; a cell is text or (text, color).
+    def __init__(self, parent, columns, font, header_font, row_height=30):
+        super().__init__(parent)
+        self.columns = columns  # [(title, width, anchor)]
+        self.font = font
+        self.row_height = row_height
+        self.rows = []
+        self.top = 0
+
+        width = sum(col[1] for col in columns)
+        self.header = tk.Canvas(self, height=row_height + 6, width=width, highlightthickness=0)
+        self.canvas = tk.Canvas(self, width=width, highlightthickness=0, background="white")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.header.pack(side="top", fill="x")
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        for x, y, text, anchor in self._cells((row_height + 6) / 2, [col[0] for col in columns]):
+            self.header.create_text(x, y, text=text, font=header_font, anchor=anchor)
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        for widget in (self.canvas, self.header):
+            widget.bind("<MouseWheel>", lambda e: self.scroll_rows(-1 if e.delta > 0 else 1, 3))
+            widget.bind("<Button-4>", lambda e: self.scroll_rows(-1, 3))
+            widget.bind("<Button-5>", lambda e: self.scroll_rows(1, 3))
+
+    def _cells(self, y, cells):
+        x = 0
+        for (title, width, anchor), cell in zip(self.columns, cells):
+            text = cell[0] if isinstance(cell, tuple) else cell
+            if anchor == "w":
+                yield x + 5, y, text, "w"
+            else:
+                yield x + width / 2, y, text, "center"
+            x += width
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.top = 0
+        self.redraw()
+
+    def visible_count(self):
+        return max(1, self.canvas.winfo_height() // self.row_height)
+
+    def scroll_rows(self, direction, count):
+        self.top += direction * count
+        self.redraw()
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_count()
+            self.top += step
+        self.redraw()
+
+    def redraw(self):
+        visible = self.visible_count()
+        self.top = max(0, min(self.top, len(self.rows) - visible))
+        self.canvas.delete("row")
+        for i in range(self.top, min(len(self.rows), self.top + visible + 1)):
+            y = (i - self.top) * self.row_height + self.row_height / 2
+            cells = self.rows[i]
+            for (x, y_pos, text, anchor), cell in zip(self._cells(y, cells), cells):
+                color = cell[1] if isinstance(cell, tuple) else "black"
+                self.canvas.create_text(x, y_pos, text=text, fill=color, font=self.font, anchor=anchor, tags="row")
+        if self.rows:
+            self.scrollbar.set(self.top / len(self.rows), min(1.0, (self.top + visible) / len(self.rows)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+class SwissSimulatorGUI:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("瑞士輪模擬器")
+        self.root.geometry("1020x700")  # Adjusted default window size
+        self.root.resizable(True, True)
+        self.root.iconbitmap('')
+
+        # Define default fonts
+        self.default_font = ("Arial", 16)
+        self.default_bold_font = ("Arial", 16, "bold")
+        self.mono_font = ("Courier New", 16)
+
+        # Define rating colors
+        self.rating_colors = {
+            "偏弱": "purple",
+            "正常": "green",
+            "偏強": "blue",
+            "高手": "red",
+            "地獄": "black"
+        }
+
+        self.engine = TournamentEngine()
+        self.confirm_players_enabled = True
+        self.pairing_modes = {
+            "貪婪配對": PAIRING_GREEDY,
+            "最佳匹配": PAIRING_MATCHING
+        }
+
+        style = ttk.Style()
+        style.theme_use("clam")
+        style.configure("Red.TButton", foreground="white", background="red", font=self.default_bold_font)
+        style.map("Red.TButton", background=[("active", "darkred")], foreground=[("active", "white")])
+        style.configure("Gold.TButton", foreground="black", background="gold", font=self.default_bold_font)
+        style.map("Gold.TButton", background=[("active", "goldenrod")], foreground=[("active", "black")])
+        style.configure("Large.TButton", font=self.default_bold_font)
+        style.configure("Treeview", font=self.default_font)
+        style.configure("Treeview.Heading", font=self.default_bold_font)
+
+        self.main_frame = ttk.Frame(root, padding="10")
+        self.main_frame.pack(fill="both", expand=True)
+
+        self.left_frame = ttk.LabelFrame(self.main_frame, text="輸入區", padding="5")
+        self.left_frame.pack(side="left", fill="y", padx=5)
+
+        ttk.Label(self.left_frame, text="玩家姓名（每行一個）：", font=self.default_font).pack(anchor="w")
+        self.player_input = scrolledtext.ScrolledText(self.left_frame, width=25, height=10, font=self.default_font)
+        self.player_input.pack(pady=5)
+
+        rounds_frame = ttk.Frame(self.left_frame)
+        rounds_frame.pack(anchor="w", pady=5)
+        ttk.Label(rounds_frame, text="輪次數量：", font=self.default_font).pack(side="left")
+        self.rounds_entry = ttk.Entry(rounds_frame, width=10, font=self.default_font)
+        self.rounds_entry.pack(side="left")
+        self.rounds_entry.insert(0, "4")
+
+        mode_frame = ttk.Frame(self.left_frame)
+        mode_frame.pack(anchor="w", pady=5)
+        ttk.Label(mode_frame, text="配對模式：", font=self.default_font).pack(side="left")
+        self.pairing_mode_var = tk.StringVar(value="貪婪配對")
+        ttk.Combobox(mode_frame, textvariable=self.pairing_mode_var, values=list(self.pairing_modes), state="readonly", width=8, font=self.default_font).pack(side="left")
+
+        self.confirm_players_button = ttk.Button(self.left_frame, text="確認玩家", command=self.confirm_players, style="Large.TButton")
+        self.confirm_players_button.pack(pady=5)
+        self.custom_first_round_button = ttk.Button(self.left_frame, text="自訂第一輪", command=self.custom_first_round, state="disabled", style="Large.TButton")
+        self.custom_first_round_button.pack(pady=5)
+        self.next_round_button = ttk.Button(self.left_frame, text="下一輪", command=self.next_round, state="disabled", style="Large.TButton")
+        self.next_round_button.pack(pady=5)
+        rankings_button = ttk.Button(self.left_frame, text="排名查詢", command=self.show_rankings, style="Gold.TButton")
+        rankings_button.pack(pady=5)
+        history_frame = ttk.Frame(self.left_frame)
+        history_frame.pack(pady=5)
+        undo_button = ttk.Button(history_frame, text="上一步", command=self.undo_step, style="Large.TButton")
+        undo_button.pack(side="left", padx=2)
+        redo_button = ttk.Button(history_frame, text="下一步", command=self.redo_step, style="Large.TButton")
+        redo_button.pack(side="left", padx=2)
+        self.result_window = None
+        # Export that follows every confirmed round, see export_to_csv
+        self.csv_writer = None
+
+        # Shown only while pairing, standings or an export runs in the background
+        self.task = None
+        # Confirm buttons of the result and custom pairing windows, disabled
+        # with the action buttons while a task runs
+        self.dialog_buttons = []
+        self.task_frame = ttk.Frame(self.left_frame)
+        self.task_label = ttk.Label(self.task_frame, text="", font=self.default_font)
+        self.task_label.pack(anchor="w")
+        self.task_progress = ttk.Progressbar(self.task_frame, length=200, maximum=1.0)
+        self.task_progress.pack(fill="x", pady=2)
+        ttk.Button(self.task_frame, text="取消", command=self.cancel_task, style="Large.TButton").pack(pady=2)
+
+        bottom_frame = ttk.Frame(self.left_frame)
+        bottom_frame.pack(side="bottom", fill="x", pady=5)
+        self.action_buttons = [self.confirm_players_button, self.custom_first_round_button, self.next_round_button, rankings_button,
+                               undo_button, redo_button]
+        for text, command, button_style in (("匯出CSV", self.export_to_csv, "Large.TButton"),
+                                            ("匯入CSV", self.import_from_csv, "Large.TButton"),
+                                            ("重新開始", self.reset_confirm, "Red.TButton"),
+                                            ("復原", self.restore_archived, "Large.TButton")):
+            button = ttk.Button(bottom_frame, text=text, command=command, style=button_style)
+            button.pack(side="left", padx=2)
+            self.action_buttons.append(button)
+
+        self.right_frame = ttk.LabelFrame(self.main_frame, text="結果區", padding="5")
+        self.right_frame.pack(side="right", fill="both", expand=True, padx=5)
+
+        # Add current round label on top of the result area
+        self.current_round_label = ttk.Label(self.right_frame, text="目前輪次: 0", font=self.default_bold_font)
+        self.current_round_label.pack(anchor="n", pady=5)
+
+        self.tree = ttk.Treeview(self.right_frame, columns=("Table", "Match", "Result"), show="headings", height=15)
+        self.tree.heading("Table", text="桌號")
+        self.tree.heading("Match", text="配對")
+        self.tree.heading("Result", text="結果")
+        self.tree.column("Table", width=60, anchor="center")
+        self.tree.column("Match", width=250, anchor="center")
+        self.tree.column("Result", width=250, anchor="center")
+        self.tree.pack(fill="both", expand=True, pady=5)
+
+        self.score_text = scrolledtext.ScrolledText(self.right_frame, width=60, height=40, font=self.mono_font)
+        self.score_text.pack(fill="x", pady=5)
+
+        # Every pairing and result is journaled so a crash or reset can be undone
+        self.journal = Journal(JOURNAL_DIR)
+        if self.journal.has_state() and messagebox.askyesno("復原", "發現未完成的賽事記錄，是否復原？"):
+            self.journal.recover(self.engine)
+            self.refresh_from_engine()
+        self.journal.attach(self.engine)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        if self.task:
+            self.task.cancel()
+        if self.engine.instruments:
+            self.engine.instruments.close()
+        self.close_csv_writer()
+        self.journal.close()
+        self.root.destroy()
+
+    def run_in_background(self, label, work, on_done):
+        # Runs work(task) off the Tk thread with a progress bar and a cancel
+        # button; every action and dialog confirm button is disabled until it
+        # finishes, then on_done(result) runs on the Tk thread unless it was
+        # cancelled. Only one task runs at a time, since it may be reading the
+        # engine; returns False if another one is still running.
+        if self.task_running(self.root):
+            return False
+        task = BackgroundTask(work)
+        self.task = task
+        self.dialog_buttons = [button for button in self.dialog_buttons if button.winfo_exists()]
+        saved_states = [(button, button.cget("state")) for button in self.action_buttons + self.dialog_buttons]
+        for button, _ in saved_states:
+            button.config(state="disabled")
+        self.task_label.config(text=label)
+        self.task_progress.config(mode="indeterminate", value=0)
+        self.task_progress.start(10)
+        self.task_frame.pack(fill="x", pady=5)
+
+        def poll():
+            if not task.done:
+                if task.progress is not None:
+                    if str(self.task_progress.cget("mode")) != "determinate":
+                        self.task_progress.stop()
+                        self.task_progress.config(mode="determinate")
+                    self.task_progress.config(value=task.progress)
+                self.root.after(TASK_POLL_MS, poll)
+                return
+            self.task_progress.stop()
+            self.task_frame.pack_forget()
+            self.task = None
+            for button, state in saved_states:
+                if button.winfo_exists():
+                    button.config(state=state)
+            if task.cancelled:
+                messagebox.showinfo("已取消", f"{label}已取消")
+            elif task.error is not None:
+                messagebox.showerror("錯誤", f"{label}失敗: {str(task.error)}")
+            else:
+                on_done(task.result)
+
+        task.start()
+        self.root.after(TASK_POLL_MS, poll)
+        return True
+
+    def add_dialog_button(self, button):
+        # A button that changes the engine from another window
+        self.dialog_buttons.append(button)
+        if self.task is not None:
+            button.config(state="disabled")
+        return button
+
+    def task_running(self, parent):
+        if self.task is None:
+            return False
+        messagebox.showinfo("請稍候", "背景工作進行中，請稍後再試！", parent=parent)
+        return True
+
+    def cancel_task(self):
+        if self.task:
+            self.task.cancel()
+
+    def refresh_from_engine(self):
+        engine = self.engine
+        started = engine.current_round > 0 or bool(engine.custom_pairs)
+        self.player_input.delete("1.0", tk.END)
+        self.player_input.insert(tk.END, "\n".join(p.name for p in engine.players))
+        self.rounds_entry.delete(0, tk.END)
+        self.rounds_entry.insert(0, str(engine.rounds or 4))
+        self.confirm_players_enabled = not started
+        self.confirm_players_button.config(state="disabled" if started else "normal")
+        self.custom_first_round_button.config(state="normal" if engine.players and not started else "disabled")
+        self.current_round_label.config(text=f"目前輪次: {engine.current_round}")
+
+        self.tree.delete(*self.tree.get_children())
+        self.score_text.delete("1.0", tk.END)
+        if not engine.players:
+            self.next_round_button.config(state="disabled")
+            return
+        self.score_text.insert(tk.END, f"參賽人數: {len(engine.players)}\n")
+        self.score_text.insert(tk.END, f"總輪次: {engine.rounds}\n")
+        if engine.current_round == 0:
+            self.next_round_button.config(state="normal")
+            return
+
+        self.show_pairings(engine.current_round, engine.paired_matches, engine.current_round == 1 and bool(engine.custom_pairs))
+        if engine.results_confirmed:
+            results = [match[3] for match in engine.match_history if match[0] == engine.current_round and match[2] != BYE]
+            self.show_results(results)
+            self.next_round_button.config(state="normal")
+            self.update_scores()
+        else:
+            self.next_round_button.config(state="disabled")
+            self.input_results()
+
+    def undo_step(self):
+        # Takes back the last pairing or result entry; nothing is lost, 下一步
+        # puts it back and entering something else starts a new branch
+        try:
+            self.engine.undo()
+        except ValueError as e:
+            messagebox.showerror("錯誤", str(e))
+            return
+        self.close_result_window()
+        self.refresh_from_engine()
+
+    def redo_step(self):
+        try:
+            self.engine.redo()
+        except ValueError as e:
+            messagebox.showerror("錯誤", str(e))
+            return
+        self.close_result_window()
+        self.refresh_from_engine()
+
+    def close_result_window(self):
+        if self.result_window is not None and self.result_window.winfo_exists():
+            self.result_window.destroy()
+        self.result_window = None
+        self.root.title("瑞士輪模擬器")
+
+    def close_csv_writer(self):
+        # Finishes the auto-updated export with the standings at this point
+        if self.csv_writer is not None:
+            self.csv_writer.close()
+            self.csv_writer = None
+
+    def restore_archived(self):
+        if not messagebox.askyesno("確認", "是否復原上一場被清空的賽事？目前進度將另存至記錄中。"):
+            return
+        self.close_csv_writer()
+        if not self.journal.recover_archived(self.engine):
+            messagebox.showerror("錯誤", "沒有可復原的賽事記錄！")
+            return
+        self.close_result_window()
+        self.refresh_from_engine()
+
+    def get_omw_rating(self, omw):
+        if omw <= 0.4:
+            return "偏弱"
+        elif omw <= 0.5:
+            return "正常"
+        elif omw <= 0.6:
+            return "偏強"
+        elif omw <= 0.7:
+            return "高手"
+        else:
+            return "地獄"
+
+    def confirm_players(self):
+        if not self.confirm_players_enabled:
+            return
+
+        names = self.player_input.get("1.0", tk.END).strip().split("\n")
+        try:
+            rounds = int(self.rounds_entry.get())
+        except ValueError:
+            rounds = 0
+
+        try:
+            self.engine.setup(names, rounds)
+        except ValueError as e:
+            messagebox.showerror("錯誤", str(e))
+            return
+
+        engine = self.engine
+        self.next_round_button.config(state="normal")
+        if engine.current_round == 0:
+            self.custom_first_round_button.config(state="normal")
+        self.tree.delete(*self.tree.get_children())
+        self.score_text.delete("1.0", tk.END)
+        self.score_text.insert(tk.END, f"參賽人數: {len(engine.players)}\n")
+        self.score_text.insert(tk.END, f"總輪次: {engine.rounds}\n")
+        self.current_round_label.config(text=f"目前輪次: {engine.current_round}")  # Update round label
+
+    def custom_first_round(self):
+        if not self.engine.players:
+            messagebox.showerror("錯誤", "請先輸入玩家姓名並確認！")
+            return
+
+        self.confirm_players_enabled = False
+        self.confirm_players_button.config(state="disabled")
+
+        engine = self.engine
+        custom_window = tk.Toplevel(self.root)
+        custom_window.title("自訂第一輪配對")
+        custom_window.geometry("760x560")
+        custom_window.resizable(True, True)
+        custom_window.iconbitmap('')
+
+        # Players not yet seated, by id; the list shows them in entry order.
+        # Assigning or removing a pair only touches the two players involved
+        # and one refilter of the visible list.
+        unassigned = set(range(len(engine.players)))
+        pairs = []
+        shown = []
+        pending = []
+
+        ttk.Label(custom_window, text="雙擊兩位玩家組成一桌（人數為奇數時留一人輪空）", font=self.default_font).pack(pady=5)
+        body = ttk.Frame(custom_window)
+        body.pack(fill="both", expand=True, padx=5)
+
+        left = ttk.Frame(body)
+        left.pack(side="left", fill="both", expand=True, padx=5)
+        search_var = tk.StringVar(value="")
+        search_frame = ttk.Frame(left)
+        search_frame.pack(fill="x")
+        ttk.Label(search_frame, text="搜尋：", font=self.default_font).pack(side="left")
+        search_entry = ttk.Entry(search_frame, textvariable=search_var, font=self.default_font)
+        search_entry.pack(side="left", fill="x", expand=True)
+        pending_label = ttk.Label(left, text="", font=self.default_font)
+        pending_label.pack(anchor="w")
+        player_list = tk.Listbox(left, font=self.default_font, exportselection=False)
+        player_scroll = ttk.Scrollbar(left, orient="vertical", command=player_list.yview)
+        player_list.config(yscrollcommand=player_scroll.set)
+        player_scroll.pack(side="right", fill="y")
+        player_list.pack(side="left", fill="both", expand=True)
+
+        right = ttk.Frame(body)
+        right.pack(side="right", fill="both", expand=True, padx=5)
+        pairs_label = ttk.Label(right, text="", font=self.default_font)
+        pairs_label.pack(anchor="w")
+        pair_list = tk.Listbox(right, font=self.default_font, exportselection=False)
+        pair_scroll = ttk.Scrollbar(right, orient="vertical", command=pair_list.yview)
+        pair_list.config(yscrollcommand=pair_scroll.set)
+        pair_scroll.pack(side="right", fill="y")
+        pair_list.pack(side="left", fill="both", expand=True)
+
+        def refilter(*args):
+            text = search_var.get().strip().lower()
+            shown[:] = [i for i in sorted(unassigned) if not text or text in engine.players[i].name.lower()]
+            player_list.delete(0, tk.END)
+            if shown:
+                player_list.insert(tk.END, *(engine.players[i].name for i in shown))
+            pending_label.config(text=f"已選: {engine.players[pending[0]].name}" if pending else f"未配對: {len(unassigned)} 人")
+            pairs_label.config(text=f"已配對: {len(pairs)} 桌")
+
+        def pick(event=None):
+            selection = player_list.curselection()
+            if not selection:
+                return
+            player_id = shown[selection[0]]
+            if pending and pending[0] == player_id:
+                pending.clear()
+            elif pending:
+                add_pair(pending.pop(), player_id)
+                search_var.set("")
+            else:
+                pending.append(player_id)
+                search_var.set("")
+            refilter()
+            search_entry.focus_set()
+
+        def pick_first(event=None):
+            # Enter in the search box takes the first match
+            if shown:
+                player_list.selection_clear(0, tk.END)
+                player_list.selection_set(0)
+                pick()
+
+        def add_pair(a, b):
+            unassigned.discard(a)
+            unassigned.discard(b)
+            pairs.append((a, b))
+            pair_list.insert(tk.END, f"{len(pairs)}. {engine.players[a].name} vs {engine.players[b].name}")
+
+        def remove_pair():
+            selection = pair_list.curselection()
+            if not selection:
+                return
+            a, b = pairs.pop(selection[0])
+            unassigned.update((a, b))
+            pair_list.delete(0, tk.END)
+            pair_list.insert(tk.END, *(f"{n}. {engine.players[a].name} vs {engine.players[b].name}" for n, (a, b) in enumerate(pairs, 1)))
+            refilter()
+
+        def import_pairs():
+            filename = filedialog.askopenfilename(parent=custom_window, title="匯入種子配對", filetypes=[("Text", "*.txt *.csv"), ("All", "*.*")])
+            if not filename:
+                return
+            try:
+                with open(filename, encoding='utf-8') as f:
+                    name_pairs = engine.parse_pair_lines(f)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("錯誤", str(e), parent=custom_window)
+                return
+            # Replaces whatever was assigned by hand
+            unassigned.update(range(len(engine.players)))
+            pairs.clear()
+            pending.clear()
+            pair_list.delete(0, tk.END)
+            for p1_name, p2_name in name_pairs:
+                add_pair(engine.get_player(p1_name).id, engine.get_player(p2_name).id)
+            refilter()
+
+        search_var.trace_add("write", refilter)
+        search_entry.bind("<Return>", pick_first)
+        player_list.bind("<Double-Button-1>", pick)
+        player_list.bind("<Return>", pick)
+        pair_list.bind("<Delete>", lambda e: remove_pair())
+
+        def save_pairs():
+            if self.task_running(custom_window):
+                return
+            try:
+                bye_player = engine.set_custom_pairs([(engine.players[a].name, engine.players[b].name) for a, b in pairs])
+            except ValueError as e:
+                messagebox.showerror("錯誤", str(e), parent=custom_window)
+                return
+            if bye_player:
+                self.score_text.insert(tk.END, f"{bye_player.name} 輪空 (自動獲勝)\n")
+
+            self.custom_first_round_button.config(state="disabled")
+            custom_window.destroy()
+
+        buttons = ttk.Frame(custom_window)
+        buttons.pack(pady=10)
+        ttk.Button(buttons, text="移除配對", command=remove_pair, style="Large.TButton").pack(side="left", padx=5)
+        ttk.Button(buttons, text="從檔案匯入", command=import_pairs, style="Large.TButton").pack(side="left", padx=5)
+        self.add_dialog_button(ttk.Button(buttons, text="確認配對", command=save_pairs, style="Large.TButton")).pack(side="left", padx=5)
+        refilter()
+        search_entry.focus_set()
+
+    def show_pairings(self, round_num, paired, custom=False):
+        with self.engine.timer("ui_pairings"):
+            self._show_pairings(round_num, paired, custom)
+
+    def _show_pairings(self, round_num, paired, custom):
+        if custom:
+            self.score_text.insert(tk.END, f"\n第 {round_num} 輪配對（自訂）：\n")
+        else:
+            self.score_text.insert(tk.END, f"\n第 {round_num} 輪配對：\n")
+        for table, (p1, p2) in enumerate(paired, 1):
+            self.tree.insert("", "end", values=(table, f"{p1.name} vs {p2.name}", ""))
+        if self.engine.bye_player:
+            self.score_text.insert(tk.END, f"{self.engine.bye_player.name} 輪空 (自動獲勝)\n")
+
+    def input_results(self, bulk=None):
+        engine = self.engine
+        if not engine.paired_matches:
+            messagebox.showerror("錯誤", "請先進行配對！")
+            return
+        if bulk is None:
+            bulk = len(engine.paired_matches) > BULK_ENTRY_THRESHOLD
+
+        self.close_result_window()
+        self.root.title(f"瑞士輪模擬器 - 輸入第 {engine.current_round} 輪結果")
+        result_window = tk.Toplevel(self.root)
+        self.result_window = result_window
+        result_window.title(f"輸入第 {engine.current_round} 輪結果")
+        if bulk:
+            window_height = 500
+        else:
+            window_height = min(50 * len(engine.paired_matches) + 200, self.root.winfo_screenheight() - 100)
+        result_window.geometry(f"400x{window_height}")
+        result_window.resizable(True, True)
+        result_window.iconbitmap('')
+
+        def on_result_window_close():
+            self.root.title("瑞士輪模擬器")
+            result_window.destroy()
+
+        result_window.protocol("WM_DELETE_WINDOW", on_result_window_close)
+
+        def switch_to_bulk():
+            result_window.destroy()
+            self.input_results(bulk=True)
+
+        if bulk:
+            ttk.Label(result_window, text="每行一場：桌號, 勝者（或 雙敗）", font=self.default_font).pack(pady=5)
+            result_input = scrolledtext.ScrolledText(result_window, width=30, height=12, font=self.default_font)
+
+            def load_file():
+                filename = filedialog.askopenfilename(parent=result_window, title="載入結果", filetypes=[("Text", "*.txt *.csv"), ("All", "*.*")])
+                if filename:
+                    with open(filename, encoding='utf-8') as f:
+                        result_input.delete("1.0", tk.END)
+                        result_input.insert("1.0", f.read())
+
+            def get_results():
+                return engine.parse_result_lines(result_input.get("1.0", tk.END).splitlines())
+
+            ttk.Button(result_window, text="從檔案載入", command=load_file, style="Large.TButton").pack(pady=5)
+            result_input.pack(fill="both", expand=True, padx=5, pady=5)
+        else:
+            ttk.Label(result_window, text="選擇每場比賽的結果：", font=self.default_font).pack(pady=5)
+            ttk.Button(result_window, text="批次輸入", command=switch_to_bulk, style="Large.TButton").pack(pady=5)
+            winner_vars = []
+            for p1, p2 in engine.paired_matches:
+                frame = ttk.Frame(result_window)
+                frame.pack(fill="x", pady=5)
+                ttk.Label(frame, text=f"{p1.name} vs {p2.name}", font=self.default_font).pack(side="left", padx=5)
+                var = tk.StringVar(value="")
+                ttk.Combobox(frame, textvariable=var, values=[p1.name, p2.name, DOUBLE_LOSS], state="readonly", font=self.default_font).pack(side="right", padx=5)
+                winner_vars.append(var)
+
+            def get_results():
+                return [var.get() for var in winner_vars]
+
+        def save_results():
+            if self.task_running(result_window):
+                return
+            try:
+                winners = get_results()
+                engine.record_results(winners)
+            except ValueError as e:
+                messagebox.showerror("錯誤", str(e), parent=result_window)
+                return
+
+            if engine.is_finished():
+                self.close_csv_writer()
+            self.score_text.insert(tk.END, f"第 {engine.current_round} 輪結果：\n")
+            self.show_results(winners)
+            self.next_round_button.config(state="normal")
+            self.update_scores()
+            self.root.title("瑞士輪模擬器")
+            result_window.destroy()
+
+        self.add_dialog_button(ttk.Button(result_window, text="確認結果", command=save_results, style="Large.TButton")).pack(pady=10)
+
+    def show_results(self, results):
+        with self.engine.timer("ui_results"):
+            self._show_results(results)
+
+    def _show_results(self, results):
+        self.tree.tag_configure("double_loss", foreground="red")
+        self.tree.tag_configure("winner", foreground="green")
+        for item, (table, (p1, p2)), result in zip(self.tree.get_children(), enumerate(self.engine.paired_matches, 1), results):
+            if result == DOUBLE_LOSS:
+                self.tree.item(item, values=(table, f"{p1.name} vs {p2.name}", DOUBLE_LOSS), tags="double_loss")
+            else:
+                self.tree.item(item, values=(table, f"{p1.name} vs {p2.name}", f"勝者: {result}"), tags="winner")
+
+    def format_standings(self, final=False, task=None):
+        with self.engine.timer("ui_standings"):
+            return self._format_standings(final, task)
+
+    def _format_standings(self, final, task):
+        # Safe to call from a background task while edits are blocked: it
+        # reads the tournament, and standings() may refresh the engine's
+        # standings cache
+        engine = self.engine
+        sorted_players = engine.standings()
+        max_name_length = max(len(player.name) for player in sorted_players) + 2
+        lines = ["\n最終排名：\n" if final else "\n當前積分：\n"]
+        for i, player in enumerate(sorted_players, 1):
+            if task is not None and i % 1024 == 0:
+                task.check()
+                task.report(i / len(sorted_players))
+            record = f"{player.wins}-{player.losses}"
+            if engine.current_round <= 1 and not final:
+                omw_display = "--"
+            else:
+                omw_value = engine.get_omw(player)
+                rating = self.get_omw_rating(omw_value)
+                omw_display = f"{rating}; {omw_value:.2f}"
+            if final:
+                lines.append(f"{i}. {player.name:<{max_name_length}} | {record:^10} | {omw_display:>20}\n")
+            else:
+                lines.append(f"{player.name:<{max_name_length}} | {record:^10} | {omw_display:>20}\n")
+        return "".join(lines)
+
+    def update_scores(self):
+        # The table is built on a worker thread and inserted in one go
+        self.run_in_background("計算積分", lambda task: self.format_standings(task=task),
+                               lambda text: self.score_text.insert(tk.END, text))
+
+    def next_round(self):
+        engine = self.engine
+        if not engine.players:
+            messagebox.showerror("錯誤", "請先輸入玩家姓名並確認！")
+            return
+        
+        if engine.current_round > 0 and not engine.results_confirmed:
+            messagebox.showerror("錯誤", "請先確認當前輪次的比賽結果！")
+            return
+
+        self.confirm_players_enabled = False
+        self.confirm_players_button.config(state="disabled")
+
+        if engine.is_finished():
+            def show_final(text):
+                self.score_text.insert(tk.END, text)
+                self.next_round_button.config(state="disabled")
+                messagebox.showinfo("完成", "所有輪次已完成！")
+
+            self.run_in_background("計算最終排名", lambda task: self.format_standings(final=True, task=task), show_final)
+            return
+
+        round_num = engine.current_round + 1
+        mode = self.pairing_modes[self.pairing_mode_var.get()]
+
+        def pair(task):
+            # Only reads the engine; the round is applied back on the Tk thread
+            return engine.compute_pairings(round_num, mode, task.should_stop, task.report)
+
+        def apply(pairing):
+            paired, bye_player, fell_back = pairing
+            custom = round_num == 1 and bool(engine.custom_pairs)
+            self.next_round_button.config(state="disabled")
+            self.custom_first_round_button.config(state="disabled")
+            self.tree.delete(*self.tree.get_children())
+            engine.load_round(round_num, paired, bye_player, fell_back)
+            self.show_pairings(round_num, engine.paired_matches, custom)
+            if engine.pairing_fell_back:
+                self.score_text.insert(tk.END, "（最佳匹配逾時，已改用貪婪配對）\n")
+            self.current_round_label.config(text=f"目前輪次: {engine.current_round}")  # Update round label
+            self.input_results()
+
+        self.run_in_background(f"第 {round_num} 輪配對", pair, apply)
+
+    def reset_confirm(self):
+        if messagebox.askyesno("確認", "是否要重新開始？所有進度將清空！"):
+            self.close_csv_writer()
+            self.engine.reset()
+            self.next_round_button.config(state="disabled")
+            self.custom_first_round_button.config(state="disabled")
+            self.confirm_players_enabled = True
+            self.confirm_players_button.config(state="normal")
+            self.player_input.delete("1.0", tk.END)
+            self.rounds_entry.delete(0, tk.END)
+            self.rounds_entry.insert(0, "4")
+            self.tree.delete(*self.tree.get_children())
+            self.score_text.delete("1.0", tk.END)
+            self.current_round_label.config(text="目前輪次: 0")  # Reset round label
+
+    def export_to_csv(self):
+        engine = self.engine
+        if not engine.match_history:
+            messagebox.showerror("錯誤", "目前沒有比賽記錄可匯出！")
+            return
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"swiss_tournament_{timestamp}.csv"
+        if not (engine.is_finished() and engine.results_confirmed) and messagebox.askyesno(
+                "自動更新", "賽事尚未結束，是否在每輪結果確認後自動更新此檔案？"):
+            # The file gets each round as it is confirmed and the standings
+            # once the event ends, the app closes or a new event replaces it
+            self.close_csv_writer()
+            self.csv_writer = CsvRoundWriter(engine, filename)
+            messagebox.showinfo("成功", f"比賽記錄將持續匯出至 {filename}")
+            return
+
+        # The worker writes from its own copy, taken here on the Tk thread,
+        # so nothing entered meanwhile can change the engine under it
+        state = engine.snapshot()
+
+        def export(task):
+            copy = TournamentEngine()
+            copy.restore(state)
+            if not export_csv(copy, filename, task.should_stop):
+                raise TaskCancelled()
+
+        self.run_in_background("匯出", export, lambda result: messagebox.showinfo("成功", f"比賽記錄已匯出至 {filename}"))
+
+    def import_from_csv(self):
+        filename = filedialog.askopenfilename(title="匯入CSV", filetypes=[("CSV", "*.csv")])
+        if not filename:
+            return
+        if self.engine.players and not messagebox.askyesno("確認", "匯入將取代目前的賽事（可用「復原」找回），是否繼續？"):
+            return
+        try:
+            rounds = int(self.rounds_entry.get())
+        except ValueError:
+            rounds = None
+        try:
+            imported = import_csv(filename, rounds)
+        except Exception as e:
+            messagebox.showerror("錯誤", f"匯入失敗: {str(e)}")
+            return
+        self.close_csv_writer()
+        self.engine.restore(imported.snapshot())
+        self.close_result_window()
+        self.refresh_from_engine()
+
+    def show_rankings(self):
+        engine = self.engine
+        if not engine.players:
+            messagebox.showerror("錯誤", "請先輸入玩家姓名並確認！")
+            return
+
+        ranking_window = tk.Toplevel(self.root)
+        ranking_window.title("目前排名")
+        ranking_window.geometry("680x500")
+        ranking_window.resizable(True, True)
+        ranking_window.iconbitmap('')
+
+        columns = [("排名", 70, "center"), ("玩家", 150, "w"), ("戰績 (勝-負)", 130, "center"), ("對手綜合強度", 180, "center"),
+                   ("對手的對手", 110, "center")]
+        table = VirtualTable(ranking_window, columns, self.default_font, self.default_bold_font)
+        ttk.Button(ranking_window, text="關閉", command=ranking_window.destroy, style="Large.TButton").pack(side="bottom", pady=10)
+        table.pack(fill="both", expand=True)
+
+        rows = []
+        tiebreaks = engine.tiebreaks()
+        for i, player in enumerate(engine.standings(), 1):
+            record = f"{player.wins}-{player.losses}"
+            if engine.current_round <= 1:
+                omw_cell = "--"
+                oomw_cell = "--"
+            else:
+                omw_value = tiebreaks.omw[player.id]
+                rating = self.get_omw_rating(omw_value)
+                omw_cell = (f"{rating}; {omw_value:.2f}", self.rating_colors.get(rating, "black"))
+                oomw_cell = f"{tiebreaks.oomw[player.id]:.2f}"
+            rows.append((str(i), player.name, record, omw_cell, oomw_cell))
+        table.set_rows(rows)
+
+if __name__ == "__main__":
+    root = tk.Tk()
+    app = SwissSimulatorGUI(root)
     root.mainloop()
\ No newline at end of file